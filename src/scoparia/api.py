@@ -612,9 +612,12 @@ class HTTPAuthentication:
 # ==============================================================================
 
 
-class Link(msgspec.Struct):
+class Link(msgspec.Struct, gc=False):
     """Class representing a link with text and URL.
 
+    Links only hold strings and never form reference cycles, so they are
+    not tracked by the garbage collector.
+
     Attributes
     ----------
     text : str
@@ -851,9 +854,12 @@ class Page(msgspec.Struct):
 # ==============================================================================
 
 
-class RSSForumPost(msgspec.Struct):
+class RSSForumPost(msgspec.Struct, gc=False):
     """Class representing a forum post from RSS feed.
 
+    Posts are created in bulk on every run and never form reference cycles,
+    so they are not tracked by the garbage collector.
+
     Attributes
     ----------
     post_id : int
@@ -872,6 +878,8 @@ class RSSForumPost(msgspec.Struct):
         Publish datetime
     site_url : str
         Site URL where this post is from
+    parents : list[Link]
+        Breadcrumb links (category, thread and parent posts)
     """
 
     post_id: int
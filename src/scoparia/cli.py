@@ -3,7 +3,7 @@
 import argparse
 import sys
 
-from . import api, config, core, logger, mongodb
+from . import api, config, core, crom, github_storage, logger, mongodb
 
 
 def setup_argument_parser() -> argparse.ArgumentParser:
@@ -77,15 +77,21 @@ async def _async_main() -> None:
         # Cleanup
         await core_instance.cleanup()
         await api.cleanup_client()
+        await crom.cleanup_crom()
         await mongodb.cleanup_mongodb()
 
-        logger.info("Run completed successfully")
-        sys.exit(0)
-
     except Exception as e:
         logger.error("Run failed: %s", e, exc_info=True)
         sys.exit(1)
 
+    finally:
+        # Persist buffered GitHub variables here rather than at exit, so a
+        # failed write fails the run instead of being ignored
+        github_storage.flush_github_env()
+
+    logger.info("Run completed successfully")
+    sys.exit(0)
+
 
 def main() -> None:
     """Main entry point."""
@@ -2,7 +2,10 @@
 
 import os
 import re
+from collections.abc import Mapping
 from enum import Enum
+from functools import lru_cache
+from types import MappingProxyType
 
 import msgspec
 
@@ -17,6 +20,14 @@ class LogLevel(Enum):
     CRITICAL = "critical"
 
 
+# Accepted Wikidot site URL shape, checked after trailing slashes are stripped
+_WIKIDOT_URL = r"https?://[\w\-]+\.wikidot\.com"
+_WIKIDOT_URL_RE = re.compile(rf"^{_WIKIDOT_URL}$")
+
+# A newline-joined list of Wikidot site URLs, each with optional trailing slashes
+_WIKIDOT_URL_LIST_RE = re.compile(rf"{_WIKIDOT_URL}/*(?:\n{_WIKIDOT_URL}/*)*")
+
+
 def validate_and_normalize_wikidot_url(url: str) -> str:
     """Validate and normalize a Wikidot site URL.
 
@@ -36,8 +47,7 @@ def validate_and_normalize_wikidot_url(url: str) -> str:
     normalized_url = url.rstrip("/")
 
     # Validate format: http[s]://xxx.wikidot.com
-    pattern = r"^https?://[\w\-]+\.wikidot\.com$"
-    if not re.match(pattern, normalized_url):
+    if not _WIKIDOT_URL_RE.match(normalized_url):
         raise ValueError(
             f"Invalid Wikidot URL format: {url}. "
             f"Expected format: http[s]://xxx.wikidot.com"
@@ -66,9 +76,12 @@ class MentionLevel(str, Enum):
     ALL = "all"
 
 
-class UserInfo(msgspec.Struct):
+class UserInfo(msgspec.Struct, gc=False):
     """User information from MongoDB.
 
+    One instance is held per monitored user and none of them form reference
+    cycles, so they are not tracked by the garbage collector.
+
     Attributes
     ----------
     userid : int
@@ -117,27 +130,87 @@ class ScopariaConfig(msgspec.Struct):
     # MongoDB connection (optional - if not set, runs in no-database mode)
     mongodb_uri: str | None
 
-    # RSS site URLs to monitor (from environment variable as JSON)
-    rss_site_urls: list[str]
+    # RSS site URLs to monitor (from environment variable as JSON); a tuple,
+    # since parsed configs are cached and shared between callers
+    rss_site_urls: tuple[str, ...]
+
+    # Users configuration (required in no-database mode, optional in MongoDB mode);
+    # read-only, since parsed configs are cached and shared between callers
+    users: Mapping[int, UserInfo]
 
-    # Users configuration (required in no-database mode, optional in MongoDB mode)
-    users: dict[int, UserInfo]
+    # User documents fetched per MongoDB cursor round trip
+    mongodb_batch_size: int = 1000
 
+    # Maximum BCC recipients per email when sending to several addresses
+    email_batch_size: int = 500
 
-def load_config_from_env() -> ScopariaConfig:
+    # Maximum concurrent Microsoft Graph send requests (Graph throttles beyond ~4)
+    email_concurrency: int = 4
+
+
+# Typed JSON decoders for the config environment variables, built once
+_RSS_SITE_URLS_DECODER = msgspec.json.Decoder(list[str])
+_USERS_DECODER = msgspec.json.Decoder(dict[int, UserInfo])
+
+
+def load_config_from_env(env: Mapping[str, str] = os.environ) -> ScopariaConfig:
     """Load configuration from environment variables.
 
+    Parsed configurations are cached per set of environment values, so
+    repeated calls with an unchanged environment skip the JSON decoding.
+
+    Args:
+        env: Environment to read the variables from. Defaults to the process
+            environment; tests pass a plain mapping instead of patching it.
+
     Returns:
         ScopariaConfig instance.
 
     Raises:
         ValueError: If required environment variables are missing.
     """
-    # Required environment variables
-    wikidot_username = os.getenv("WIKIDOT_USERNAME")
-    wikidot_password = os.getenv("WIKIDOT_PASSWORD")
-    rss_site_urls_str = os.getenv("RSS_SITE_URLS")
+    return _load_config(
+        env.get("WIKIDOT_USERNAME"),
+        env.get("WIKIDOT_PASSWORD"),
+        env.get("RSS_SITE_URLS"),
+        # MongoDB URI (optional - if not set, runs in no-database mode)
+        env.get("MONGODB_URI") or None,
+        env.get("USERS_JSON"),
+        env.get("SCOPARIA_MONGODB_BATCH_SIZE"),
+        env.get("SCOPARIA_EMAIL_BATCH_SIZE"),
+        env.get("SCOPARIA_EMAIL_CONCURRENCY"),
+    )
+
+
+@lru_cache(maxsize=4)
+def _load_config(
+    wikidot_username: str | None,
+    wikidot_password: str | None,
+    rss_site_urls_str: str | None,
+    mongodb_uri: str | None,
+    users_json_str: str | None,
+    mongodb_batch_size_str: str | None,
+    email_batch_size_str: str | None,
+    email_concurrency_str: str | None,
+) -> ScopariaConfig:
+    """Build configuration from raw environment variable values.
 
+    Args:
+        wikidot_username: Value of WIKIDOT_USERNAME.
+        wikidot_password: Value of WIKIDOT_PASSWORD.
+        rss_site_urls_str: Value of RSS_SITE_URLS.
+        mongodb_uri: Value of MONGODB_URI, or None if unset or empty.
+        users_json_str: Value of USERS_JSON.
+        mongodb_batch_size_str: Value of SCOPARIA_MONGODB_BATCH_SIZE.
+        email_batch_size_str: Value of SCOPARIA_EMAIL_BATCH_SIZE.
+        email_concurrency_str: Value of SCOPARIA_EMAIL_CONCURRENCY.
+
+    Returns:
+        ScopariaConfig instance.
+
+    Raises:
+        ValueError: If required values are missing or invalid.
+    """
     if not wikidot_username:
         raise ValueError("WIKIDOT_USERNAME environment variable is required")
     if not wikidot_password:
@@ -145,27 +218,30 @@ def load_config_from_env() -> ScopariaConfig:
     if not rss_site_urls_str:
         raise ValueError("RSS_SITE_URLS environment variable is required")
 
-    # MongoDB URI (optional - if not set, runs in no-database mode)
-    mongodb_uri = os.getenv("MONGODB_URI") or None
-
     # Parse RSS site URLs from JSON using msgspec
     try:
-        rss_site_urls = msgspec.json.decode(rss_site_urls_str, type=list[str])
+        rss_site_urls = _RSS_SITE_URLS_DECODER.decode(rss_site_urls_str)
     except msgspec.DecodeError:
         raise ValueError(
             "RSS_SITE_URLS must be a valid JSON array of strings"
         ) from None
 
-    # Validate and normalize each URL
-    try:
-        rss_site_urls = [
-            validate_and_normalize_wikidot_url(url) for url in rss_site_urls
-        ]
-    except ValueError:
-        raise ValueError("Invalid RSS site URL format") from None
+    # Validate all URLs in one match; URLs that themselves contain newlines
+    # would be split apart, so those take the per-URL path below
+    joined_urls = "\n".join(rss_site_urls)
+    one_url_per_line = joined_urls.count("\n") == len(rss_site_urls) - 1
+    if one_url_per_line and _WIKIDOT_URL_LIST_RE.fullmatch(joined_urls):
+        site_urls = tuple(url.rstrip("/") for url in rss_site_urls)
+    else:
+        # Validate and normalize each URL
+        try:
+            site_urls = tuple(
+                validate_and_normalize_wikidot_url(url) for url in rss_site_urls
+            )
+        except ValueError:
+            raise ValueError("Invalid RSS site URL format") from None
 
     # Users JSON (required in no-database mode, optional in mongodb mode)
-    users_json_str = os.getenv("USERS_JSON")
     users: dict[int, UserInfo] = {}
 
     # In no-database mode (mongodb_uri is None), USERS_JSON is required
@@ -177,7 +253,7 @@ def load_config_from_env() -> ScopariaConfig:
 
     if users_json_str:
         try:
-            users = msgspec.json.decode(users_json_str, type=dict[int, UserInfo])
+            users = _USERS_DECODER.decode(users_json_str)
         except (msgspec.DecodeError, ValueError, TypeError):
             raise ValueError(
                 "USERS_JSON must be a valid JSON object mapping userid to UserInfo"
@@ -187,11 +263,45 @@ def load_config_from_env() -> ScopariaConfig:
         wikidot_username=wikidot_username,
         wikidot_password=wikidot_password,
         mongodb_uri=mongodb_uri,
-        rss_site_urls=rss_site_urls,
-        users=users,
+        rss_site_urls=site_urls,
+        users=MappingProxyType(users),
+        mongodb_batch_size=_parse_positive_int(
+            "SCOPARIA_MONGODB_BATCH_SIZE", mongodb_batch_size_str, 1000
+        ),
+        email_batch_size=_parse_positive_int(
+            "SCOPARIA_EMAIL_BATCH_SIZE", email_batch_size_str, 500
+        ),
+        email_concurrency=_parse_positive_int(
+            "SCOPARIA_EMAIL_CONCURRENCY", email_concurrency_str, 4
+        ),
     )
 
 
+def _parse_positive_int(name: str, value: str | None, default: int) -> int:
+    """Parse an optional positive integer environment variable.
+
+    Args:
+        name: Name of the environment variable, for error messages.
+        value: Raw value, or None if unset.
+        default: Value used when the variable is unset or empty.
+
+    Returns:
+        The parsed integer, or default.
+
+    Raises:
+        ValueError: If the value is not an integer of at least 1.
+    """
+    if not value:
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer") from None
+    if number < 1:
+        raise ValueError(f"{name} must be at least 1")
+    return number
+
+
 # Global configuration object
 cfg: ScopariaConfig | None = None
 
@@ -1,12 +1,14 @@
 """Scoparia core notification logic."""
 
+import asyncio
 import os
+import re
 from collections import defaultdict
+from collections.abc import Iterable, Mapping
 from datetime import UTC, datetime
 
 import apprise
 import msgspec
-from bs4 import BeautifulSoup
 
 from . import logger
 from .api import (
@@ -17,17 +19,36 @@ from .api import (
     RSSForumPost,
     get_client,
     sync_user_configs_from_wiki,
-    user_parse,
 )
 from .config import MentionLevel, UserInfo, get_config
 from .crom import get_page_author_id_from_crom
-from .emailer import send_email
+from .emailer import send_email_many
 from .formatter import generate_formatter
 from .github_storage import set_github_variable
 from .mongodb import get_mongodb
 
 UNTITLED_POST_TITLE = "(untitled post)"
 
+# A user mention up to the userInfo(<id>) call of its profile link; group 1
+# is the avatarhover class and group 2 the user ID. The match may not leave
+# the span, so deleted/anonymous/guest mentions never borrow a later ID.
+_MENTION_RE = re.compile(
+    r'<span class="printuser( avatarhover)?"[^>]*>'
+    r"(?:(?!</span>).)*?userInfo\((\d+)\)",
+    re.DOTALL,
+)
+
+# Post HTML length above which the mention scan costs more than handing it
+# to a worker thread (the scan runs at roughly 1 ms per 750 KB)
+_MENTION_SCAN_THREAD_THRESHOLD = 256 * 1024
+
+# Pending email notifications with identical content, keyed by
+# (timezone, post keys) and holding the posts and the users to send them to
+EmailBatch = dict[
+    tuple[str, tuple[tuple[str, int], ...]],
+    tuple[list[RSSForumPost], list[UserInfo]],
+]
+
 
 class ScopariaCore:
     """Main Scoparia core class for RSS monitoring and notifications."""
@@ -40,6 +61,10 @@ class ScopariaCore:
             int, list[RSSForumPost]
         ](list)
 
+        # User config sync settings (environment does not change mid-process)
+        self.config_wiki_url = os.getenv("CONFIG_WIKI_URL")
+        self.user_config_category = os.getenv("USER_CONFIG_CATEGORY")
+
     async def initialize(self) -> None:
         """Initialize core components."""
         logger.info("Scoparia core initialized")
@@ -72,8 +97,8 @@ class ScopariaCore:
         """
         logger.info("Starting user configs synchronization...")
 
-        config_wiki_url = os.getenv("CONFIG_WIKI_URL")
-        user_config_category = os.getenv("USER_CONFIG_CATEGORY")
+        config_wiki_url = self.config_wiki_url
+        user_config_category = self.user_config_category
 
         if not config_wiki_url or not user_config_category:
             logger.warning(
@@ -96,7 +121,7 @@ class ScopariaCore:
     def _check_mentions(
         self,
         target_post: ForumPost,
-        users: dict[int, UserInfo],
+        users: Mapping[int, UserInfo],
         users_to_notify: set[int],
     ) -> None:
         """Check for @mentions in post content and add to notification list.
@@ -106,62 +131,62 @@ class ScopariaCore:
             users: Dictionary of monitored users
             users_to_notify: Set to add notified users to
         """
-        # Parse HTML and find all user mentions (span.printuser elements)
-        post_html = BeautifulSoup(target_post.text, "lxml")
-        mentioned_user_elements = post_html.select("span.printuser")
+        # No mention can add anything once every monitored user is notified
+        if len(users_to_notify) >= len(users):
+            return
 
-        for user_elem in mentioned_user_elements:
-            try:
-                # Parse the user element to get user info
-                mentioned_user = user_parse(user_elem)
-                userid = mentioned_user.id
+        # Most posts mention nobody; a substring check is cheaper than the regex
+        if "printuser" not in target_post.text:
+            return
 
-                # Skip if invalid, not monitored, or already notified
-                if not userid or userid not in users or userid in users_to_notify:
-                    continue
+        # Scan the HTML once for user mentions (span.printuser elements)
+        for match in _MENTION_RE.finditer(target_post.text):
+            userid = int(match.group(2))
 
-                # Check user's mention notification level preference
-                user_info = users[userid]
-                mention_level = user_info.mention_level
+            # Skip if not monitored or already notified
+            if userid not in users or userid in users_to_notify:
+                continue
 
-                # Skip if user disabled mention notifications
-                if mention_level == MentionLevel.DISABLED:
-                    logger.debug(
-                        "User %s has disabled mention notifications",
-                        user_info.username,
-                    )
-                    continue
+            # Check user's mention notification level preference
+            user_info = users[userid]
+            mention_level = user_info.mention_level
 
-                # Check if element has avatarhover class
-                elem_classes = user_elem.get("class")
-                has_avatarhover = (
-                    isinstance(elem_classes, list) and "avatarhover" in elem_classes
+            # Skip if user disabled mention notifications
+            if mention_level is MentionLevel.DISABLED:
+                logger.debug(
+                    "User %s has disabled mention notifications",
+                    user_info.username,
                 )
+                continue
 
-                # Skip if user only wants avatarhover but this isn't one
-                if mention_level == MentionLevel.AVATARHOVER and not has_avatarhover:
-                    logger.debug(
-                        "User %s requires avatarhover, but mention doesn't have it",
-                        user_info.username,
-                    )
-                    continue
+            # Check if element has avatarhover class
+            has_avatarhover = match.group(1) is not None
 
-                # User should be notified
-                users_to_notify.add(userid)
+            # Skip if user only wants avatarhover but this isn't one
+            if mention_level is MentionLevel.AVATARHOVER and not has_avatarhover:
                 logger.debug(
-                    "Post %s mentions %s%s",
-                    target_post.id,
+                    "User %s requires avatarhover, but mention doesn't have it",
                     user_info.username,
-                    " (avatarhover)" if has_avatarhover else "",
                 )
-            except Exception as e:
-                logger.debug("Failed to parse mentioned user element: %s", e)
+                continue
+
+            # User should be notified
+            users_to_notify.add(userid)
+            logger.debug(
+                "Post %s mentions %s%s",
+                target_post.id,
+                user_info.username,
+                " (avatarhover)" if has_avatarhover else "",
+            )
+
+            if len(users_to_notify) == len(users):
+                return
 
     async def _check_reply(
         self,
         target_post: ForumPost,
         thread: ForumThread,
-        users: dict[int, UserInfo],
+        users: Mapping[int, UserInfo],
         users_to_notify: set[int],
     ) -> None:
         """Check for reply notifications.
@@ -196,8 +221,9 @@ class ScopariaCore:
                 users[thread_creator_id].username,
             )
 
-        # Check page author (if thread is associated with a page)
-        if thread.page_fullname:
+        # Check page author (if thread is associated with a page); the lookup
+        # is a network request, so skip it once every user is notified
+        if thread.page_fullname and len(users_to_notify) < len(users):
             page_author_id = None
 
             # Try to get page author from CROM API first (faster and more reliable)
@@ -236,18 +262,25 @@ class ScopariaCore:
                 )
 
     async def check_post_for_users(
-        self, post: RSSForumPost, users: dict[int, UserInfo]
-    ) -> None:
+        self, post: RSSForumPost, users: Mapping[int, UserInfo]
+    ) -> set[int]:
         """Check if a post mentions any monitored users.
 
         Checks if the post replies to, or is in a thread/page created by
-        any monitored users. Adds the post to self.all_user_notifications for
-        each user that should be notified.
+        any monitored users, and fills in the post's parent links. The post
+        itself is the only object modified, and notifications are returned
+        rather than recorded on the core, so distinct posts can be checked
+        concurrently and merged by the caller.
 
         Args:
             post: Post dictionary from RSS feed.
             users: Dictionary mapping userid to UserInfo.
+
+        Returns:
+            Set of user IDs that should be notified about this post.
         """
+        logger.debug("Processing post %s by %s", post.post_id, post.author_name)
+
         try:
             logger.debug("Getting post details for post %s", post.post_id)
             logger.debug("Getting site for post %s", post.post_id)
@@ -265,7 +298,7 @@ class ScopariaCore:
                 logger.warning(
                     "Could not find post %s in thread %s", post.post_id, post.thread_id
                 )
-                return
+                return set()
 
             # Collect all users that should be notified (using set for deduplication)
             users_to_notify = set[int]()
@@ -273,8 +306,14 @@ class ScopariaCore:
             # Check for reply notifications
             await self._check_reply(target_post, thread, users, users_to_notify)
 
-            # Check for mentions in post content
-            self._check_mentions(target_post, users, users_to_notify)
+            # Check for mentions in post content; oversized posts are scanned
+            # in a worker thread so the event loop keeps serving other posts
+            if len(target_post.text) > _MENTION_SCAN_THREAD_THRESHOLD:
+                await asyncio.to_thread(
+                    self._check_mentions, target_post, users, users_to_notify
+                )
+            else:
+                self._check_mentions(target_post, users, users_to_notify)
 
             # Build parent links
             post.parents = [
@@ -291,12 +330,22 @@ class ScopariaCore:
                 for parent in reversed(target_post.parents)
             ]
 
-            # Add post to notification list for each user
-            for userid in users_to_notify:
-                self.all_user_notifications[userid].append(post)
+            return users_to_notify
 
         except Exception as e:
             logger.error("Error checking post %s: %s", post.post_id, e, exc_info=True)
+            return set()
+
+    def _bulk_extend(self, userids: Iterable[int], post: RSSForumPost) -> None:
+        """Queue one post for several users.
+
+        Args:
+            userids: IDs of the users to notify about the post.
+            post: The post to queue.
+        """
+        notifications = self.all_user_notifications
+        for userid in userids:
+            notifications[userid].append(post)
 
     async def _send_apprise_notification(
         self, user_info: UserInfo, posts: list[RSSForumPost]
@@ -353,53 +402,68 @@ class ScopariaCore:
         except Exception as e:
             logger.error("Failed to send notification to %s: %s", user_info.username, e)
 
-    def _send_email_notification(
-        self, user_info: UserInfo, posts: list[RSSForumPost]
-    ) -> None:
-        """Send notification via email.
+    async def _flush_email_batch(self, email_batch: EmailBatch) -> None:
+        """Send all pending email notifications, one email per distinct content.
+
+        Users sharing the same content receive one BCC email, and the
+        distinct emails are sent concurrently.
 
         Args:
-            user_info: User information with email address.
-            posts: List of forum posts to notify about.
+            email_batch: Pending email notifications to send.
         """
-        if not user_info.email:
-            logger.warning(
-                "User %s has no email address configured", user_info.username
+        messages: list[tuple[str, str, str | list[str]]] = []
+        recipients: list[str] = []
+        for posts, users in email_batch.values():
+            usernames = ", ".join(user_info.username for user_info in users)
+            try:
+                # Compose notification with HTML format (same timezone for all users)
+                formatter = generate_formatter("html")
+                title, body = formatter.compose_notification_content(
+                    posts, users[0].timezone
+                )
+            except Exception as e:
+                logger.error(
+                    "Failed to compose email notification to %s: %s",
+                    usernames,
+                    e,
+                    exc_info=True,
+                )
+                continue
+
+            to_email: str | list[str] = (
+                users[0].email
+                if len(users) == 1
+                else [user_info.email for user_info in users if user_info.email]
             )
-            return
+            messages.append((title, body, to_email))
+            recipients.append(usernames)
+        email_batch.clear()
 
-        if not posts:
-            logger.warning("Notification for %s has no posts", user_info.username)
+        if not messages:
             return
 
         try:
-            # Compose notification with HTML format
-            formatter = generate_formatter("html")
-            title, body = formatter.compose_notification_content(
-                posts, user_info.timezone
+            results = await send_email_many(messages)
+        except Exception as e:
+            logger.error(
+                "Failed to send email notifications to %s: %s",
+                ", ".join(recipients),
+                e,
+                exc_info=True,
             )
+            return
 
-            # Send email
-            success = send_email(title=title, body=body, to_email=user_info.email)
-
+        for (_, _, to_email), usernames, success in zip(
+            messages, recipients, results, strict=True
+        ):
             if success:
                 logger.info(
-                    "Sent %s post(s) notification to %s via email",
-                    len(posts),
-                    user_info.username,
+                    "Sent email notification to %s (%s recipient(s))",
+                    usernames,
+                    1 if isinstance(to_email, str) else len(to_email),
                 )
             else:
-                logger.warning(
-                    "Failed to send email notification to %s",
-                    user_info.username,
-                )
-        except Exception as e:
-            logger.error(
-                "Failed to send email notification to %s: %s",
-                user_info.username,
-                e,
-                exc_info=True,
-            )
+                logger.warning("Failed to send email notification to %s", usernames)
 
     async def _send_wikidot_pm_notification(
         self, user_info: UserInfo, posts: list[RSSForumPost]
@@ -451,7 +515,10 @@ class ScopariaCore:
             )
 
     async def send_all_notifications(
-        self, user_info: UserInfo, posts: list[RSSForumPost]
+        self,
+        user_info: UserInfo,
+        posts: list[RSSForumPost],
+        email_batch: EmailBatch | None = None,
     ) -> None:
         """Send notifications via all enabled channels.
 
@@ -462,6 +529,10 @@ class ScopariaCore:
         Args:
             user_info: User information with notification settings.
             posts: List of forum posts to notify about.
+            email_batch: If given, the email notification is queued here
+                instead of being sent, so users receiving identical content
+                can share one email (see _flush_email_batch). Otherwise the
+                email is sent right away.
         """
         if not posts:
             logger.warning("Notification for %s has no posts", user_info.username)
@@ -494,7 +565,14 @@ class ScopariaCore:
         # Send email notification if enabled and email is configured
         if user_info.enable_email:
             if user_info.email:
-                self._send_email_notification(user_info, posts)
+                batch_key = (
+                    user_info.timezone,
+                    tuple((post.site_url, post.post_id) for post in posts),
+                )
+                pending: EmailBatch = {} if email_batch is None else email_batch
+                pending.setdefault(batch_key, (posts, []))[1].append(user_info)
+                if email_batch is None:
+                    await self._flush_email_batch(pending)
             else:
                 logger.debug(
                     "Skipping email notification for %s (no email configured)",
@@ -506,6 +584,39 @@ class ScopariaCore:
                 user_info.username,
             )
 
+    async def send_all_notifications_bulk(
+        self,
+        users: Mapping[int, UserInfo],
+        user_posts: Mapping[int, list[RSSForumPost]],
+    ) -> None:
+        """Send notifications to many users concurrently.
+
+        Each user is notified via send_all_notifications, with all users
+        handled at once. Email notifications with identical content are
+        coalesced and sent after every user has been processed.
+
+        Args:
+            users: Dictionary mapping userid to UserInfo.
+            user_posts: Posts to notify about, keyed by userid.
+        """
+        email_batch: EmailBatch = {}
+        results = await asyncio.gather(
+            *(
+                self.send_all_notifications(users[userid], posts, email_batch)
+                for userid, posts in user_posts.items()
+            ),
+            return_exceptions=True,
+        )
+        for userid, result in zip(user_posts, results, strict=True):
+            if isinstance(result, Exception):
+                logger.error(
+                    "Failed to send notifications to %s: %s",
+                    users[userid].username,
+                    result,
+                    exc_info=result,
+                )
+        await self._flush_email_batch(email_batch)
+
     async def process_rss_feed(self) -> None:
         """Process RSS feed and send notifications.
 
@@ -556,6 +667,9 @@ class ScopariaCore:
                 logger.warning("Failed to parse LAST_RSS_CHECK. Treating as first run")
                 last_rss_check_dict = {}
 
+        # Sites with a previous timestamp, to be fetched concurrently
+        sites_to_fetch: list[tuple[str, datetime]] = []
+
         for site_url in rss_site_urls:
             # Get last check timestamp for this specific site
             last_check = last_rss_check_dict.get(site_url)
@@ -572,22 +686,31 @@ class ScopariaCore:
                 last_check = last_check.replace(tzinfo=UTC)
 
             logger.debug("Last check time for %s: %s", site_url, last_check.isoformat())
+            sites_to_fetch.append((site_url, last_check))
+
+        # Sites are independent endpoints, so fetch them all at once
+        fetch_results = await asyncio.gather(
+            *(
+                get_client().fetch_rss_posts(site_url, since=last_check)
+                for site_url, last_check in sites_to_fetch
+            ),
+            return_exceptions=True,
+        )
 
-            try:
-                site_posts, build_date = await get_client().fetch_rss_posts(
-                    site_url, since=last_check
-                )
-                new_posts.extend(site_posts)
-                logger.info("Fetched %s posts from %s", len(site_posts), site_url)
-
-                site_timestamps[site_url] = build_date
-            except Exception as e:
+        for (site_url, _), result in zip(sites_to_fetch, fetch_results, strict=True):
+            if isinstance(result, BaseException):
                 logger.error(
-                    "Failed to fetch RSS from %s: %s", site_url, e, exc_info=True
+                    "Failed to fetch RSS from %s: %s", site_url, result, exc_info=result
                 )
                 # Don't update LAST_RSS_CHECK for failed sites
                 continue
 
+            site_posts, build_date = result
+            new_posts.extend(site_posts)
+            logger.info("Fetched %s posts from %s", len(site_posts), site_url)
+
+            site_timestamps[site_url] = build_date
+
         # Update timestamps after successful fetch
         # Only update timestamps for successfully fetched sites
         # Failed sites will keep their previous timestamps
@@ -601,11 +724,10 @@ class ScopariaCore:
                     updated_timestamps[site_url] = timestamp.replace(tzinfo=UTC)
                 else:
                     updated_timestamps[site_url] = timestamp
-            # Convert datetime objects to strings for GitHub variable
-            updated_timestamps_str = msgspec.json.encode(updated_timestamps).decode(
-                "utf-8"
+            # Encoded JSON bytes are written to the GitHub variable as-is
+            set_github_variable(
+                "LAST_RSS_CHECK", msgspec.json.encode(updated_timestamps)
             )
-            set_github_variable("LAST_RSS_CHECK", updated_timestamps_str)
 
         # Handle first run
         if is_first_run and not new_posts:
@@ -617,24 +739,23 @@ class ScopariaCore:
             return
 
         logger.info(
-            f"Processing {len(new_posts)} new posts from {len(rss_site_urls)} sites"
+            "Processing %d new posts from %d sites", len(new_posts), len(rss_site_urls)
         )
 
         # Reset notification state for this processing run
         self.all_user_notifications.clear()
 
-        # Process each new post
-        for post in new_posts:
-            logger.debug("Processing post %s by %s", post.post_id, post.author_name)
+        # Check all new posts concurrently
+        results = await asyncio.gather(
+            *(self.check_post_for_users(post, users) for post in new_posts)
+        )
 
-            # Check if any users should be notified for this post
-            await self.check_post_for_users(post, users)
+        # Merge per-post results serially, preserving post order per user
+        for post, users_to_notify in zip(new_posts, results, strict=True):
+            self._bulk_extend(users_to_notify, post)
 
-        # Send notifications (one per user)
-        for userid, posts_list in self.all_user_notifications.items():
-            user_info = users[userid]
-            # Send all notifications via enabled channels
-            await self.send_all_notifications(user_info, posts_list)
+        # Send notifications (one per user), coalescing identical emails
+        await self.send_all_notifications_bulk(users, self.all_user_notifications)
 
         logger.info("RSS feed processing complete. Processed %s posts", len(new_posts))
 
@@ -1,60 +1,167 @@
 """CROM API client for fetching page author information."""
 
+import asyncio
 import base64
+import re
 
 import aiohttp
 import msgspec
-from aiohttp_retry import ExponentialRetry, RetryClient
 
 from . import logger
 
 CROM_API_URL = "https://apiv2.crom.avn.sh/graphql"
 
+# Statuses that are retried with exponential backoff (429 honours Retry-After);
+# other server errors such as 501 or 505 are raised without retrying
+CROM_RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+CROM_RETRY_ATTEMPTS = 10
+CROM_RETRY_START_TIMEOUT = 0.4
+CROM_RETRY_MAX_TIMEOUT = 30.0
 
-class CROMRetryOptions(ExponentialRetry):
-    """Custom retry options that respect Retry-After header for rate limiting."""
-
-    def get_timeout(
-        self, attempt: int, response: aiohttp.ClientResponse | None = None
-    ) -> float:
-        """Get timeout for next retry, respecting Retry-After header.
-
-        Args:
-            attempt: Current attempt number (1-indexed).
-            response: The response object, if available.
-
-        Returns:
-            Timeout in seconds before next retry.
-        """
-        # Check if response has Retry-After header (for 429 rate limiting)
-        if response is not None and response.status == 429:
-            retry_after = response.headers.get("Retry-After")
-            if retry_after:
-                try:
-                    # Retry-After can be either seconds or HTTP date
-                    # Try to parse as integer (seconds) first
-                    wait_time = float(retry_after)
-                    logger.info(
-                        "Rate limited, respecting Retry-After: %ss",
-                        wait_time,
-                    )
-                    return wait_time
-                except ValueError:
-                    # If not a number, it might be an HTTP date
-                    # For simplicity, fall back to exponential backoff
-                    logger.warning(
-                        "Retry-After header contains date format: %s, "
-                        "using exponential backoff instead",
-                        retry_after,
-                    )
-
-        # Fall back to exponential backoff
-        return super().get_timeout(attempt, response)
+# Lookups are spread across the whole run, so idle connections are kept well
+# beyond aiohttp's 15s default instead of paying a new TLS handshake each time
+CROM_KEEPALIVE_TIMEOUT = 60.0
+
+# Page authors never change, so lookups are memoized for the whole run
+CROM_AUTHOR_CACHE_SIZE = 1024
+
+# Extracts the wikidot ID from a decoded CROM user id
+# Format: {"type":"WikidotUser","id":"8366274"} (whitespace may vary)
+_WIKIDOT_ID_PATTERN = re.compile(rb'"id"\s*:\s*"?(\d+)')
+
+# GraphQL bodies are encoded with msgspec rather than aiohttp's json.dumps
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Shared client session, created lazily inside the running event loop
+_session: aiohttp.ClientSession | None = None
+
+# Author IDs keyed by canonical page URL, oldest entries evicted first
+_author_cache: dict[str, int | None] = {}
+
+
+def _get_session() -> aiohttp.ClientSession:
+    """Get the shared CROM client session, creating it on first use.
+
+    Returns:
+        The shared aiohttp.ClientSession.
+    """
+    global _session
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(keepalive_timeout=CROM_KEEPALIVE_TIMEOUT),
+            timeout=aiohttp.ClientTimeout(total=10),
+        )
+    return _session
+
+
+async def cleanup_crom() -> None:
+    """Close the shared CROM client session."""
+    global _session
+    if _session is not None:
+        await _session.close()
+        _session = None
+
+
+def _get_retry_wait(
+    attempt: int, response: aiohttp.ClientResponse, start_timeout: float
+) -> float:
+    """Get wait time before next retry, respecting Retry-After header.
+
+    Args:
+        attempt: Current attempt number (1-indexed).
+        response: The response that triggered the retry.
+        start_timeout: Base timeout for exponential backoff.
+
+    Returns:
+        Wait time in seconds before next retry.
+    """
+    # Check if response has Retry-After header (for 429 rate limiting)
+    if response.status == 429:
+        retry_after = response.headers.get("Retry-After")
+        if retry_after:
+            try:
+                # Retry-After can be either seconds or HTTP date
+                # Try to parse as integer (seconds) first
+                wait_time = float(retry_after)
+                logger.info("Rate limited, respecting Retry-After: %ss", wait_time)
+                return wait_time
+            except ValueError:
+                # If not a number, it might be an HTTP date
+                # For simplicity, fall back to exponential backoff
+                logger.warning(
+                    "Retry-After header contains date format: %s, "
+                    "using exponential backoff instead",
+                    retry_after,
+                )
+
+    # Fall back to exponential backoff
+    return min(start_timeout * 2**attempt, CROM_RETRY_MAX_TIMEOUT)
+
+
+async def _post_with_retry(
+    session: aiohttp.ClientSession,
+    url: str,
+    body: bytes,
+    *,
+    attempts: int = CROM_RETRY_ATTEMPTS,
+    start_timeout: float = CROM_RETRY_START_TIMEOUT,
+) -> bytes:
+    """POST JSON to a URL, retrying on rate limiting and server errors.
+
+    Only CROM_RETRY_STATUSES (429, 500, 502, 503 and 504) are retried. Other
+    error statuses, including the remaining 5xx codes such as 501 and 505,
+    are raised on the first response.
+
+    Args:
+        session: Client session to send the request with.
+        url: Request URL.
+        body: Encoded JSON request body.
+        attempts: Maximum number of attempts. Defaults to 10.
+        start_timeout: Base timeout for exponential backoff. Defaults to 0.4.
+
+    Returns:
+        Raw response body.
+
+    Raises:
+        aiohttp.ClientResponseError: If the final response is an error status,
+            including a retried status once every attempt has been used.
+    """
+    for attempt in range(1, attempts + 1):
+        async with session.post(url, data=body, headers=_JSON_HEADERS) as response:
+            if response.status not in CROM_RETRY_STATUSES or attempt == attempts:
+                response.raise_for_status()
+                return await response.read()
+            wait_time = _get_retry_wait(attempt, response, start_timeout)
+
+        logger.debug(
+            "CROM request returned %s, retrying in %ss (attempt %s/%s)",
+            response.status,
+            wait_time,
+            attempt,
+            attempts,
+        )
+        await asyncio.sleep(wait_time)
+
+    raise RuntimeError("CROM retry loop exited without a response")
+
+
+def _cache_author(canonical_url: str, author_id: int | None) -> None:
+    """Memoize a page author lookup, evicting the oldest entry when full.
+
+    Args:
+        canonical_url: Canonical Wikidot URL of the page.
+        author_id: The author's user ID, or None if the account was deleted.
+    """
+    if len(_author_cache) >= CROM_AUTHOR_CACHE_SIZE:
+        del _author_cache[next(iter(_author_cache))]
+    _author_cache[canonical_url] = author_id
 
 
 async def get_page_author_id_from_crom(site_url: str, page_fullname: str) -> int | None:
     """Get page author ID from CROM API.
 
+    Successful lookups are memoized per page; failed lookups are retried.
+
     Args:
         site_url: The site URL (e.g., "https://scp-wiki-cn.wikidot.com").
         page_fullname: The full name of the page.
@@ -68,6 +175,8 @@ async def get_page_author_id_from_crom(site_url: str, page_fullname: str) -> int
     # Construct the canonical Wikidot URL
     # CROM stores all wikidot URLs as "http://" regardless of HTTPS support
     canonical_url = f"{site_url.replace('https://', 'http://')}/{page_fullname}"
+    if canonical_url in _author_cache:
+        return _author_cache[canonical_url]
 
     # GraphQL query to fetch page author using wikidotPage query
     query = """
@@ -82,48 +191,40 @@ async def get_page_author_id_from_crom(site_url: str, page_fullname: str) -> int
 
     variables = {"url": canonical_url}
 
-    # Configure retry strategy with exponential backoff and Retry-After support
-    retry_options = CROMRetryOptions(
-        attempts=10,
-        start_timeout=0.4,
-        statuses={429, 500, 502, 503, 504},
-    )
-
     try:
-        async with aiohttp.ClientSession() as session:
-            retry_client = RetryClient(
-                client_session=session, retry_options=retry_options
-            )
-            async with retry_client.post(
-                CROM_API_URL,
-                json={"query": query, "variables": variables},
-                timeout=aiohttp.ClientTimeout(total=10),
-            ) as response:
-                response.raise_for_status()
-                response_content = await response.read()
-
-            data = msgspec.json.decode(response_content)
-
-            created_by = data["data"]["wikidotPage"]["createdBy"]
-            # Returns null if the account was deleted
-            if created_by is None:
-                return None
-            # Extract author ID from response
-            # The id field is Base64-encoded JSON
-            # Format: base64({"type":"WikidotUser","id":"8366274"})
-            user_id_encoded = created_by["id"]
-
-            # Decode Base64 and parse JSON to extract wikidot ID
-            decoded_bytes = base64.b64decode(user_id_encoded)
-            user_data = msgspec.json.decode(decoded_bytes)
-            wikidot_id = user_data["id"]
-
-            logger.info(
-                "Retrieved author ID %s for %s from CROM",
-                wikidot_id,
-                canonical_url,
-            )
-            return int(wikidot_id)
+        # Retries with exponential backoff and Retry-After support
+        response_content = await _post_with_retry(
+            _get_session(),
+            CROM_API_URL,
+            msgspec.json.encode({"query": query, "variables": variables}),
+        )
+
+        data = msgspec.json.decode(response_content)
+
+        created_by = data["data"]["wikidotPage"]["createdBy"]
+        # Returns null if the account was deleted
+        if created_by is None:
+            _cache_author(canonical_url, None)
+            return None
+        # Extract author ID from response
+        # The id field is Base64-encoded JSON
+        # Format: base64({"type":"WikidotUser","id":"8366274"})
+        user_id_encoded = created_by["id"]
+
+        # Decode Base64 and pull the wikidot ID out without building a dict
+        decoded_bytes = base64.b64decode(user_id_encoded)
+        id_match = _WIKIDOT_ID_PATTERN.search(decoded_bytes)
+        if id_match is None:
+            raise ValueError(f"Unexpected CROM user id format: {user_id_encoded}")
+        wikidot_id = int(id_match.group(1))
+        _cache_author(canonical_url, wikidot_id)
+
+        logger.info(
+            "Retrieved author ID %s for %s from CROM",
+            wikidot_id,
+            canonical_url,
+        )
+        return wikidot_id
 
     except (
         aiohttp.ClientError,
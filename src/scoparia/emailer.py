@@ -1,11 +1,16 @@
 """Email sending functionality."""
 
+import asyncio
 import base64
 import os
+from datetime import datetime, timedelta
 
+import aiohttp
 import msgspec
 from O365 import Account, EnvTokenBackend, MSGraphProtocol
 
+from . import logger
+from .config import get_config
 from .github_storage import set_github_variable
 
 
@@ -77,22 +82,56 @@ def _mask_email(email: str) -> str:
         >>> _mask_email("ab@test.com")
         "ab***@test.com"
     """
-    if "@" not in email:
+    at = email.find("@")
+    if at < 0:
         return "***"
 
-    local, domain = email.split("@", 1)
-    if len(local) <= 3:
-        return f"{local}***@{domain}"
-    else:
-        return f"{local[:3]}***@{domain}"
+    # Slicing never overruns, so short local parts are kept whole
+    return f"{email[: min(at, 3)]}***{email[at:]}"
 
 
 # O365 credentials from environment variables
 _CLIENT_ID = os.getenv("O365_CLIENT_ID")
 _CLIENT_SECRET = os.getenv("O365_CLIENT_SECRET")
 
+_GRAPH_SEND_MAIL_URL = "https://graph.microsoft.com/v1.0/me/sendMail"
+
+# Refresh the access token proactively when it expires within this margin
+_TOKEN_REFRESH_MARGIN = timedelta(minutes=5)
+
 # Global account instance (cached to avoid re-authentication)
 _account: Account | None = None
+# Expiry of the cached account's access token (naive local time, as O365 uses)
+_token_expires_at: datetime | None = None
+
+
+def _refresh_token_if_expiring(account: Account) -> None:
+    """Refresh the account's access token if it is about to expire.
+
+    A refreshed token is persisted by GitHubActionTokenBackend.save_token.
+    Records the resulting expiry so later calls can skip the check.
+
+    Args:
+        account: Authenticated Account instance.
+
+    Raises:
+        RuntimeError: If the token refresh fails.
+    """
+    global _token_expires_at
+
+    connection = account.con
+    token_backend = connection.token_backend
+    expires_at = token_backend.token_expiration_datetime(username=connection.username)
+
+    if (
+        expires_at is None or datetime.now() >= expires_at - _TOKEN_REFRESH_MARGIN
+    ) and token_backend.token_is_long_lived(username=connection.username):
+        connection.refresh_token()
+        expires_at = token_backend.token_expiration_datetime(
+            username=connection.username
+        )
+
+    _token_expires_at = expires_at
 
 
 def _get_account() -> Account:
@@ -106,8 +145,17 @@ def _get_account() -> Account:
     """
     global _account
 
-    if _account is not None and _account.is_authenticated:
-        return _account
+    if _account is not None:
+        # Steady state: the cached access token is still comfortably valid
+        if (
+            _token_expires_at is not None
+            and datetime.now() < _token_expires_at - _TOKEN_REFRESH_MARGIN
+        ):
+            return _account
+
+        if _account.is_authenticated:
+            _refresh_token_if_expiring(_account)
+            return _account
 
     if not _CLIENT_ID or not _CLIENT_SECRET:
         raise ValueError(
@@ -142,53 +190,139 @@ def _get_account() -> Account:
             "3. Token has not expired (update GitHub Secret if needed)"
         )
 
+    _refresh_token_if_expiring(_account)
+
     return _account
 
 
-def send_email(title: str, body: str, to_email: str) -> bool:
-    """Send an email via Office 365.
+def _describe_recipients(recipients: list[str]) -> str:
+    """Describe recipients for logging with masked email addresses.
 
     Args:
-        title: Email subject/title.
-        body: Email body content.
-        to_email: Recipient email address.
+        recipients: List of recipient email addresses.
+
+    Returns:
+        Masked description of the recipients.
+    """
+    if not recipients:
+        return "no recipients"
+    if len(recipients) == 1:
+        return _mask_email(recipients[0])
+    return f"{_mask_email(recipients[0])} and {len(recipients) - 1} others"
+
+
+def _get_access_token() -> str:
+    """Get a valid Graph access token for the authenticated account.
 
     Returns:
-        True if email was sent successfully, False otherwise.
+        Bearer access token.
 
     Raises:
-        RuntimeError: If authentication fails.
-        Exception: If there's an error sending the email.
+        RuntimeError: If authentication fails or no access token is stored.
+    """
+    connection = _get_account().con
+    token = connection.token_backend.get_access_token(username=connection.username)
+    if not token:
+        raise RuntimeError("No O365 access token available")
+    return token["secret"]
+
+
+async def _send_graph_email(
+    session: aiohttp.ClientSession,
+    semaphore: asyncio.Semaphore,
+    batch_size: int,
+    title: str,
+    body: str,
+    to_email: str | list[str],
+) -> bool:
+    """Send one email through the Graph sendMail endpoint.
+
+    A single address goes in the To field; a list is sent as BCC in chunks
+    of batch_size.
 
-    Example:
-        >>> send_email(
-        ...     title="Test Email",
-        ...     body="This is a test email.",
-        ...     to_email="recipient@example.com"
-        ... )
-        True
+    Args:
+        session: Session carrying the Graph authorization header.
+        semaphore: Semaphore bounding concurrent Graph requests.
+        batch_size: Maximum BCC recipients per message.
+        title: Email subject.
+        body: Email body content (HTML).
+        to_email: Recipient email address or list of addresses.
+
+    Returns:
+        True if all emails were accepted, False otherwise.
     """
-    account = _get_account()
-
-    try:
-        # For authorization mode (personal accounts), use current user's mailbox
-        # No need to specify user resource - uses the authenticated user
-        mailbox = account.mailbox()
-
-        # Create message
-        message = mailbox.new_message()
-        message.to.add(to_email)
-        message.subject = title
-        message.body = body
-
-        # Send the message
-        success = message.send()
-        if success is None:
-            return False
-        return bool(success)
+    recipients = [to_email] if isinstance(to_email, str) else to_email
+    recipient_field = "toRecipients" if isinstance(to_email, str) else "bccRecipients"
+
+    all_sent = True
+    for start in range(0, len(recipients), batch_size):
+        chunk = recipients[start : start + batch_size]
+        payload = {
+            "message": {
+                "subject": title,
+                "body": {"contentType": "HTML", "content": body},
+                recipient_field: [
+                    {"emailAddress": {"address": address}} for address in chunk
+                ],
+            },
+        }
+        try:
+            async with (
+                semaphore,
+                session.post(_GRAPH_SEND_MAIL_URL, json=payload) as response,
+            ):
+                # Graph accepts the message for delivery with 202
+                if response.status != 202:
+                    logger.warning(
+                        "Graph sendMail to %s returned HTTP %s",
+                        _describe_recipients(chunk),
+                        response.status,
+                    )
+                    all_sent = False
+        except (aiohttp.ClientError, TimeoutError) as e:
+            logger.warning(
+                "Graph sendMail to %s failed: %s", _describe_recipients(chunk), e
+            )
+            all_sent = False
+    return all_sent
+
+
+async def send_email_many(
+    messages: list[tuple[str, str, str | list[str]]],
+) -> list[bool]:
+    """Send several emails concurrently through Microsoft Graph.
+
+    O365 is only used to obtain the access token; the messages are posted
+    to Graph directly, at most SCOPARIA_EMAIL_CONCURRENCY at a time.
 
-    except Exception as e:
-        # Re-raise with more context using masked email address
-        raise RuntimeError(
-            f"Failed to send email to {_mask_email(to_email)}: {e}"
-        ) from e
+    Args:
+        messages: (title, body, to_email) tuples, where to_email is a single
+            recipient address or a list of addresses to BCC.
+
+    Returns:
+        Whether each message was sent successfully, in input order.
+
+    Raises:
+        ValueError: If O365 credentials are not configured.
+        RuntimeError: If authentication fails.
+    """
+    if not messages:
+        return []
+
+    cfg = get_config()
+    headers = {"Authorization": f"Bearer {_get_access_token()}"}
+    semaphore = asyncio.Semaphore(cfg.email_concurrency)
+
+    async with aiohttp.ClientSession(
+        headers=headers, timeout=aiohttp.ClientTimeout(total=30)
+    ) as session:
+        return list(
+            await asyncio.gather(
+                *(
+                    _send_graph_email(
+                        session, semaphore, cfg.email_batch_size, title, body, to_email
+                    )
+                    for title, body, to_email in messages
+                )
+            )
+        )
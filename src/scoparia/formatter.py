@@ -1,9 +1,11 @@
 import re
 from abc import ABC, abstractmethod
+from collections import OrderedDict
+from functools import cache, lru_cache
 from zoneinfo import ZoneInfo
 
 import html2text
-from bs4 import BeautifulSoup
+from lxml import html as lxml_html
 
 from . import logger
 from .api import (
@@ -13,13 +15,39 @@ from .api import (
 
 LOGO_URL = "https://cdn.jsdelivr.net/gh/Crimone/Scoparia@main/src/scoparia/static/scoparia.webp"
 
+# Patterns stripped from QQ Push bodies
+_URL_RE = re.compile(r"https?://\S+")
+_MDLINK_RE = re.compile(r"\[([^\]]+)\]\([^)]+\)")
+_DIGITS_RE = re.compile(r"\d{5,}")
 
+# Rendered post sections shared across subscribers, keyed by
+# (formatter, site_url, post_id, timezone) and evicted least recently used
+_SECTION_CACHE_SIZE = 1024
+_section_cache: OrderedDict[tuple["NotificationFormatter", str, int, str], str] = (
+    OrderedDict()
+)
+
+
+@lru_cache(maxsize=64)
+def _get_tz(timezone: str) -> ZoneInfo:
+    """Get the ZoneInfo for a timezone name, cached across posts.
+
+    Args:
+        timezone: IANA timezone name.
+
+    Returns:
+        ZoneInfo instance for the timezone.
+    """
+    return ZoneInfo(timezone)
+
+
+@lru_cache(maxsize=1024)
 def _truncate_html_safe(html_text: str, max_length: int = 200) -> str:
     """Truncate HTML text to specified length without breaking tags.
 
     First truncates the HTML string at a safe position (not inside tags),
-    then uses BeautifulSoup to parse and automatically close any unclosed tags.
-    BeautifulSoup can handle unclosed HTML tags and will fix them automatically.
+    then parses it as an lxml fragment, which closes any unclosed tags without
+    building a full document tree.
 
     Args:
         html_text: HTML text to truncate.
@@ -28,13 +56,13 @@ def _truncate_html_safe(html_text: str, max_length: int = 200) -> str:
     Returns:
         Truncated HTML text with all tags properly closed.
     """
-    if len(html_text.strip()) == 0:
-        return html_text
-
     # Quick check: if HTML length is already under limit, return as-is
     if len(html_text) <= max_length:
         return html_text
 
+    if len(html_text.strip()) == 0:
+        return html_text
+
     # Find a safe truncation point (not inside a tag)
     truncate_pos = max_length
     tag_start = html_text.rfind("<", 0, truncate_pos)
@@ -48,14 +76,14 @@ def _truncate_html_safe(html_text: str, max_length: int = 200) -> str:
     truncated_html = html_text[:truncate_pos] + "..."
 
     try:
-        # BeautifulSoup will automatically close any unclosed tags
-        soup = BeautifulSoup(truncated_html, "lxml")
-        result = soup.body.decode_contents() if soup.body else soup.decode_contents()
+        # lxml will automatically close any unclosed tags
+        fragment = lxml_html.fragment_fromstring(truncated_html, create_parent="div")
 
-        return result
+        # Strip the synthetic <div> wrapper
+        return lxml_html.tostring(fragment, encoding="unicode")[5:-6]
     except Exception:
         # Fallback: if parsing fails, return simple truncation
-        logger.debug("BeautifulSoup parsing failed, using fallback truncation")
+        logger.debug("HTML fragment parsing failed, using fallback truncation")
         return html_text[:truncate_pos] if truncate_pos > 0 else html_text[:max_length]
 
 
@@ -73,12 +101,35 @@ def _generate_title(posts: list[RSSForumPost]) -> str:
     return f"[Scoparia] {len(posts)} new posts"
 
 
+@lru_cache(maxsize=1024)
+def _format_post_content(formatter: "NotificationFormatter", html_text: str) -> str:
+    """Truncate and format post content, cached per formatter.
+
+    When several users subscribe with the same format, each post is
+    converted once instead of once per user.
+
+    Args:
+        formatter: Formatter performing the conversion.
+        html_text: Raw HTML content of the post.
+
+    Returns:
+        Formatted, truncated content.
+    """
+    if formatter.max_content_length is not None:
+        html_text = _truncate_html_safe(
+            html_text, max_length=formatter.max_content_length
+        )
+    return formatter.format_content(html_text)
+
+
 class NotificationFormatter(ABC):
     """Abstract base class for notification content formatters."""
 
     # Class attributes that must be defined by subclasses
     separator: str
     footer: str
+    # Maximum length of post HTML before formatting; None keeps it whole
+    max_content_length: int | None = 200
 
     @abstractmethod
     def format_time(self, post: RSSForumPost, timezone: str) -> str:
@@ -176,6 +227,37 @@ class NotificationFormatter(ABC):
         """
         return body
 
+    def _render_post_section(self, post: RSSForumPost, timezone: str) -> str:
+        """Render the complete section for one post.
+
+        Args:
+            post: The RSS forum post.
+            timezone: User's timezone (IANA format).
+
+        Returns:
+            Complete formatted post section.
+        """
+        # Format time
+        publish_time_str = self.format_time(post, timezone)
+
+        # Truncate and format content
+        content = _format_post_content(self, post.content)
+
+        # Build parents line
+        parent_links = [self.format_parent_link(parent) for parent in post.parents]
+        parents_line = f"ℹ️ {' » '.join(parent_links)}"
+
+        # Format header
+        header_line = self.format_header(post, publish_time_str)
+
+        # Format link
+        link_line = self.format_link(post)
+
+        # Format complete post section
+        return self.format_post_section(
+            post, content, header_line, parents_line, link_line
+        )
+
     def compose_notification_content(
         self, posts: list[RSSForumPost], timezone: str
     ) -> tuple[str, str]:
@@ -193,30 +275,18 @@ class NotificationFormatter(ABC):
         """
         title = _generate_title(posts)
 
-        # Format posts
+        # Format posts, reusing sections already rendered for other users
         post_sections: list[str] = []
         for post in posts:
-            # Format time
-            publish_time_str = self.format_time(post, timezone)
-
-            # Truncate and format content
-            truncated_html = _truncate_html_safe(post.content, max_length=200)
-            content = self.format_content(truncated_html)
-
-            # Build parents line
-            parent_links = [self.format_parent_link(parent) for parent in post.parents]
-            parents_line = f"ℹ️ {' » '.join(parent_links)}"
-
-            # Format header
-            header_line = self.format_header(post, publish_time_str)
-
-            # Format link
-            link_line = self.format_link(post)
-
-            # Format complete post section
-            post_section = self.format_post_section(
-                post, content, header_line, parents_line, link_line
-            )
+            key = (self, post.site_url, post.post_id, timezone)
+            post_section = _section_cache.get(key)
+            if post_section is None:
+                post_section = self._render_post_section(post, timezone)
+                _section_cache[key] = post_section
+                if len(_section_cache) > _SECTION_CACHE_SIZE:
+                    _section_cache.popitem(last=False)
+            else:
+                _section_cache.move_to_end(key)
             post_sections.append(post_section)
 
         # Combine all posts
@@ -250,7 +320,7 @@ class HTMLFormatter(NotificationFormatter):
         Returns:
             Formatted time string.
         """
-        user_tz = ZoneInfo(timezone)
+        user_tz = _get_tz(timezone)
         local_time = post.publish_time.astimezone(user_tz)
         return local_time.strftime("%d %b %Y, %H:%M:%S %Z")
 
@@ -349,7 +419,7 @@ class MarkdownFormatter(NotificationFormatter):
         Returns:
             Formatted time string.
         """
-        user_tz = ZoneInfo(timezone)
+        user_tz = _get_tz(timezone)
         local_time = post.publish_time.astimezone(user_tz)
         return local_time.strftime("%d %b %Y, %H:%M:%S %Z")
 
@@ -362,10 +432,12 @@ class MarkdownFormatter(NotificationFormatter):
         Returns:
             Markdown formatted content.
         """
+        # A fresh converter per post: reset() leaves html2text's own state,
+        # such as open lists or quiet <style> blocks, to leak into the next post
         h = html2text.HTML2Text()
         h.body_width = 0  # Don't wrap lines
         content = h.handle(html_content).strip()
-        return "\n".join([f"> {line}" for line in content.split("\n")])
+        return "> " + content.replace("\n", "\n> ")
 
     def format_parent_link(self, parent: Link) -> str:
         """Format a parent link in Markdown.
@@ -454,7 +526,7 @@ class TextFormatter(NotificationFormatter):
         Returns:
             Formatted time string.
         """
-        user_tz = ZoneInfo(timezone)
+        user_tz = _get_tz(timezone)
         local_time = post.publish_time.astimezone(user_tz)
         return local_time.strftime("%d %b %Y, %H:%M:%S %Z")
 
@@ -566,7 +638,7 @@ class FTMLFormatter(NotificationFormatter):
         h.ignore_links = True
         h.body_width = 0  # Don't wrap lines
         content = h.handle(html_content).strip()
-        return "\n".join([f"> {line}" for line in content.split("\n")])
+        return "> " + content.replace("\n", "\n> ")
 
     def format_parent_link(self, parent: Link) -> str:
         """Format a parent link in FTML.
@@ -691,16 +763,20 @@ class QQPushFormatter(TextFormatter):
             Post-processed body text with links and long numbers removed.
         """
         # Remove any remaining links from the final body
-        body = re.sub(r"https?://[^\s]+", "", body)
-        body = re.sub(r"\[([^\]]+)\]\([^\)]+\)", r"\1", body)
+        body = _URL_RE.sub("", body)
+        body = _MDLINK_RE.sub(r"\1", body)
         # Remove all numbers with length 5 or more
-        body = re.sub(r"\d{5,}", "", body)
+        body = _DIGITS_RE.sub("", body)
         return body
 
 
+@cache
 def generate_formatter(format_type: str) -> NotificationFormatter:
     """Generate a formatter instance based on the format type.
 
+    Formatters keep no state between calls, so one shared instance is
+    returned per format type.
+
     Args:
         format_type: The format type string (e.g., 'html', 'markdown', 'text').
 
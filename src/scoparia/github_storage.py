@@ -4,25 +4,30 @@ This module provides functionality to store metadata using
 GitHub Variables when running in GitHub Actions without a database.
 """
 
+import atexit
 import os
 
 from . import logger
 
+# Variables waiting to be written to $GITHUB_ENV, keyed by name so that only
+# the last value of each variable is written
+_pending: dict[str, bytes] = {}
 
-def set_github_variable(variable_name: str, value: str) -> None:
+
+def set_github_variable(variable_name: str, value: bytes | str) -> None:
     """Set a GitHub variable to the GitHub environment file.
 
     In GitHub Actions, this writes to $GITHUB_ENV to update the variable
     for subsequent workflow steps and to persist via GitHub Variables API.
+    Writes are buffered until flush_github_env() is called, which the CLI
+    does at the end of every run.
 
     Args:
         variable_name: The name of the GitHub variable to set.
-        value: The string value to set.
+        value: The value to set. Bytes are written as-is (expected UTF-8),
+            which avoids decoding already-encoded JSON payloads.
     """
-    # Get GitHub environment file path
-    github_env = os.getenv("GITHUB_ENV")
-
-    if not github_env:
+    if not os.getenv("GITHUB_ENV"):
         logger.warning(
             "GITHUB_ENV not set, cannot persist %s. "
             "This is expected when running locally.",
@@ -30,11 +35,48 @@ def set_github_variable(variable_name: str, value: str) -> None:
         )
         return
 
+    if isinstance(value, str):
+        value = value.encode("utf-8")
+
+    _pending[variable_name] = value
+
+
+def flush_github_env() -> None:
+    """Write all buffered GitHub variables in a single append.
+
+    Call this explicitly before the process exits: exceptions raised from
+    atexit callbacks are ignored, so only an explicit flush can fail the run.
+
+    Raises:
+        OSError: If the GitHub environment file cannot be written.
+    """
+    if not _pending:
+        return
+
+    # Get GitHub environment file path
+    github_env = os.getenv("GITHUB_ENV")
+
+    if not github_env:
+        logger.warning("GITHUB_ENV not set, cannot persist %s.", ", ".join(_pending))
+        _pending.clear()
+        return
+
     try:
         # Append to GitHub environment file
-        with open(github_env, "a", encoding="utf-8") as env_file:
-            env_file.write(f"{variable_name}={value}\n")
-        logger.info("Set %s in GitHub environment", variable_name)
+        with open(github_env, "ab") as env_file:
+            env_file.write(
+                b"".join(
+                    b"%s=%s\n" % (name.encode("utf-8"), value)
+                    for name, value in _pending.items()
+                )
+            )
+        logger.info("Set %s in GitHub environment", ", ".join(_pending))
     except OSError as e:
         logger.error("Failed to write to GITHUB_ENV file: %s", e)
         raise
+    finally:
+        _pending.clear()
+
+
+# Fallback for callers that never flush; write errors here cannot fail the run
+atexit.register(flush_github_env)
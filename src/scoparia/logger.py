@@ -2,6 +2,7 @@
 
 import logging
 import sys
+import threading
 
 
 def setup_logger(name: str = "Scoparia", level: str = "INFO") -> logging.Logger:
@@ -35,16 +36,23 @@ def setup_logger(name: str = "Scoparia", level: str = "INFO") -> logging.Logger:
     return logger
 
 
-# Default logger
-_logger = setup_logger()
+# Default logger, configured on first use rather than at import time
+_logger: logging.Logger | None = None
+_logger_lock = threading.Lock()
 
 
 def get_logger() -> logging.Logger:
-    """Get the default Scoparia logger.
+    """Get the default Scoparia logger, configuring it on first use.
 
     Returns:
         Default logger instance.
     """
+    global _logger
+
+    if _logger is None:
+        with _logger_lock:
+            if _logger is None:
+                _logger = setup_logger()
     return _logger
 
 
@@ -54,37 +62,39 @@ def set_level(level: str) -> None:
     Args:
         level: Log level string (DEBUG, INFO, WARNING, ERROR, CRITICAL).
     """
-    _logger.setLevel(getattr(logging, level.upper()))
-    for handler in _logger.handlers:
+    logger = get_logger()
+    logger.setLevel(getattr(logging, level.upper()))
+    for handler in logger.handlers:
         handler.setLevel(getattr(logging, level.upper()))
 
 
-# Convenience functions
+# Convenience functions. Pass values as %-style arguments rather than
+# pre-formatting them, so suppressed records skip formatting entirely.
 def debug(msg: str, *args, **kwargs) -> None:
     """Log debug message."""
-    _logger.debug(msg, *args, **kwargs)
+    get_logger().debug(msg, *args, **kwargs)
 
 
 def info(msg: str, *args, **kwargs) -> None:
     """Log info message."""
-    _logger.info(msg, *args, **kwargs)
+    get_logger().info(msg, *args, **kwargs)
 
 
 def warning(msg: str, *args, **kwargs) -> None:
     """Log warning message."""
-    _logger.warning(msg, *args, **kwargs)
+    get_logger().warning(msg, *args, **kwargs)
 
 
 def error(msg: str, *args, **kwargs) -> None:
     """Log error message."""
-    _logger.error(msg, *args, **kwargs)
+    get_logger().error(msg, *args, **kwargs)
 
 
 def critical(msg: str, *args, **kwargs) -> None:
     """Log critical message."""
-    _logger.critical(msg, *args, **kwargs)
+    get_logger().critical(msg, *args, **kwargs)
 
 
 def exception(msg: str, *args, **kwargs) -> None:
     """Log exception message."""
-    _logger.exception(msg, *args, **kwargs)
+    get_logger().exception(msg, *args, **kwargs)
@@ -1,7 +1,10 @@
 """MongoDB database layer for Scoparia."""
 
 import asyncio
+from collections import OrderedDict
+from collections.abc import AsyncIterator
 from typing import Any
+from urllib.parse import parse_qsl
 
 from pymongo import AsyncMongoClient, UpdateOne
 
@@ -12,18 +15,199 @@ DB_NAME = "db_scoparia"
 COLLECTION_USERS = "t_users"
 COLLECTION_METADATA = "t_metadata"
 
+# Connection pool and timeout defaults, applied only to options the
+# connection URI does not set itself
+_CLIENT_OPTIONS: dict[str, Any] = {
+    "maxPoolSize": 32,
+    "maxIdleTimeMS": 60000,
+    "serverSelectionTimeoutMS": 5000,
+    "socketTimeoutMS": 30000,
+}
+
+# Maximum number of metadata values kept in the in-process cache
+_METADATA_CACHE_SIZE = 1024
+
+# Maximum number of operations per bulk_write command
+_BULK_WRITE_CHUNK_SIZE = 1000
+
+# Fields read by get_all_users; everything else, including _id, stays on the server
+_USER_PROJECTION = {
+    "_id": 0,
+    "userid": 1,
+    "username": 1,
+    "apprise_urls": 1,
+    "timezone": 1,
+    "mention_level": 1,
+    "email": 1,
+    "enable_wikidot_pm": 1,
+    "enable_email": 1,
+    "enable_apprise": 1,
+}
+
+# Defaults for users first created from a contact; shared by every upsert,
+# which is safe since pymongo only encodes it
+_CONTACT_ON_INSERT = {
+    "apprise_urls": [],
+    "timezone": "Asia/Shanghai",
+    "mention_level": MentionLevel.AVATARHOVER.value,
+    "enable_wikidot_pm": True,
+    "enable_email": True,
+    "enable_apprise": False,
+}
+
+# Stored mention level strings mapped to their enum members
+_MENTION_LEVELS = {level.value: level for level in MentionLevel}
+
+# Values for optional user fields missing from a document. Notification
+# flags default to True for backward compatibility with older documents.
+_USER_DEFAULTS: dict[str, Any] = {
+    "timezone": "UTC",
+    "mention_level": MentionLevel.AVATARHOVER.value,
+    "email": None,
+    "enable_wikidot_pm": True,
+    "enable_email": True,
+    "enable_apprise": True,
+}
+
+# Validators applied when ensure_schema_validation creates the collections
+_USERS_VALIDATOR = {
+    "$jsonSchema": {
+        "bsonType": "object",
+        "required": ["userid", "username", "apprise_urls"],
+        "properties": {
+            "userid": {
+                "bsonType": "int",
+                "description": "User ID (unique identifier)",
+            },
+            "username": {
+                "bsonType": "string",
+                "description": "Username of the user",
+            },
+            "enable_wikidot_pm": {
+                "bsonType": "bool",
+                "description": (
+                    "Whether to enable Wikidot private message notifications"
+                ),
+            },
+            "email": {
+                "bsonType": ["string", "null"],
+                "description": "User's email address (optional)",
+            },
+            "enable_email": {
+                "bsonType": "bool",
+                "description": "Whether to enable email notifications",
+            },
+            "apprise_urls": {
+                "bsonType": "array",
+                "items": {"bsonType": "string"},
+                "description": "List of Apprise notification URLs",
+            },
+            "enable_apprise": {
+                "bsonType": "bool",
+                "description": "Whether to enable Apprise notifications",
+            },
+            "timezone": {
+                "bsonType": "string",
+                "description": "User timezone (IANA format, e.g., 'Asia/Shanghai')",
+            },
+            "mention_level": {
+                "bsonType": "string",
+                "enum": ["disabled", "avatarhover", "all"],
+                "description": (
+                    "Level of mention notifications: disabled, avatarhover, or all"
+                ),
+            },
+        },
+    }
+}
+
+_METADATA_VALIDATOR = {
+    "$jsonSchema": {
+        "bsonType": "object",
+        "required": ["key", "value"],
+        "properties": {
+            "key": {
+                "description": "Metadata key (unique identifier)",
+            },
+            "value": {
+                "description": "Metadata value (any type)",
+            },
+        },
+    }
+}
+
+
+def _uri_option_names(mongodb_uri: str) -> set[str]:
+    """Get the names of the options set in a connection URI.
+
+    Args:
+        mongodb_uri: MongoDB connection URI.
+
+    Returns:
+        Lower-cased option names, since URI options are case-insensitive.
+    """
+    query = mongodb_uri.partition("?")[2]
+    return {name.lower() for name, _ in parse_qsl(query, keep_blank_values=True)}
+
+
+def _to_user_info(user: dict[str, Any]) -> UserInfo:
+    """Convert a user document to UserInfo, applying field defaults.
+
+    Args:
+        user: User document projected with _USER_PROJECTION.
+
+    Returns:
+        UserInfo for the document.
+    """
+    # Merge onto the defaults in one step rather than a get() per field
+    fields = _USER_DEFAULTS | user
+    # Parse mention notification level, falling back on unknown values
+    fields["mention_level"] = _MENTION_LEVELS.get(
+        fields["mention_level"], MentionLevel.AVATARHOVER
+    )
+    return UserInfo(**fields)
+
 
 class MongoDBClient:
     """Simplified MongoDB client for Scoparia."""
 
-    def __init__(self, mongodb_uri: str):
+    # Attributes are read on every database call; slots skip the instance dict
+    __slots__ = (
+        "_meta_cache",
+        "_users_batch_size",
+        "client",
+        "db",
+        "metadata",
+        "users",
+    )
+
+    def __init__(
+        self, mongodb_uri: str, users_batch_size: int = 1000, **client_options: Any
+    ):
         """Initialize MongoDB client.
 
         Args:
             mongodb_uri: MongoDB connection URI.
+            users_batch_size: User documents fetched per cursor batch (one
+                round trip each).
+            **client_options: AsyncMongoClient options overriding the
+                default pool and timeout settings.
         """
-        self.client = AsyncMongoClient(mongodb_uri)
+        # Keyword options override the URI, so skip defaults the URI sets
+        uri_options = _uri_option_names(mongodb_uri)
+        options = {
+            name: value
+            for name, value in _CLIENT_OPTIONS.items()
+            if name.lower() not in uri_options
+        }
+        self.client = AsyncMongoClient(mongodb_uri, **{**options, **client_options})
         self.db = self.client[DB_NAME]
+        # Collection handles are resolved once instead of on every operation
+        self.users = self.db[COLLECTION_USERS]
+        self.metadata = self.db[COLLECTION_METADATA]
+        self._users_batch_size = users_batch_size
+        # Write-through cache of metadata values, least recently used first
+        self._meta_cache: OrderedDict[str, Any] = OrderedDict()
 
     async def close(self) -> None:
         """Close MongoDB connection."""
@@ -46,49 +230,38 @@ class MongoDBClient:
                 ...
             }
         """
-        users: dict[int, UserInfo] = {}
-        async for user in self.db[COLLECTION_USERS].find():
-            userid = user["userid"]
-            username = user["username"]
-            apprise_urls = user["apprise_urls"]
-            timezone = user.get("timezone", "UTC")  # Default to UTC if not set
-            mention_level_str = user.get("mention_level", "avatarhover")
-            email = user.get("email")  # Optional field
-            # Get notification enable flags, default to True if not set
-            # (backward compatibility)
-            enable_wikidot_pm = user.get("enable_wikidot_pm", True)
-            enable_email = user.get("enable_email", True)
-            enable_apprise = user.get("enable_apprise", True)
-            # Parse mention notification level
-            try:
-                mention_level = MentionLevel(mention_level_str)
-            except ValueError:
-                mention_level = MentionLevel.AVATARHOVER
-
-            users[userid] = UserInfo(
-                userid=userid,
-                username=username,
-                apprise_urls=apprise_urls,
-                timezone=timezone,
-                mention_level=mention_level,
-                email=email,
-                enable_wikidot_pm=enable_wikidot_pm,
-                enable_email=enable_email,
-                enable_apprise=enable_apprise,
-            )
-        return users
+        return {user_info.userid: user_info async for user_info in self.iter_users()}
+
+    async def iter_users(self) -> AsyncIterator[UserInfo]:
+        """Stream all users from MongoDB.
 
-    async def get_user(self, userid: int) -> dict[str, Any] | None:
+        Users are yielded batch by batch, so callers that only iterate can
+        start work early and need not hold every user at once.
+
+        Yields:
+            UserInfo for each user document.
+        """
+        batch_size = self._users_batch_size
+        cursor = self.users.find({}, _USER_PROJECTION, batch_size=batch_size)
+        # Decode whole batches between awaits, bounding peak memory per batch
+        while batch := await cursor.to_list(batch_size):
+            for user in batch:
+                yield _to_user_info(user)
+
+    async def get_user(
+        self, userid: int, projection: dict[str, Any] | None = None
+    ) -> dict[str, Any] | None:
         """Get a specific user from MongoDB.
 
         Args:
             userid: Wikidot user ID.
+            projection: Fields to return. Defaults to every field except _id;
+                pass a narrower projection when only a few fields are needed.
 
         Returns:
-            User document with userid, username, apprise_urls, and timezone fields,
-            or None if user not found.
+            User document with the projected fields, or None if user not found.
         """
-        return await self.db[COLLECTION_USERS].find_one({"userid": userid})
+        return await self.users.find_one({"userid": userid}, projection or {"_id": 0})
 
     async def remove_user(self, userid: int) -> None:
         """Remove a user from MongoDB.
@@ -96,7 +269,35 @@ class MongoDBClient:
         Args:
             userid: Wikidot user ID to remove.
         """
-        await self.db[COLLECTION_USERS].delete_one({"userid": userid})
+        await self.users.delete_one({"userid": userid})
+
+    async def remove_users(self, userids: list[int]) -> None:
+        """Remove several users from MongoDB in a single round trip.
+
+        Args:
+            userids: Wikidot user IDs to remove.
+        """
+        if not userids:
+            return
+
+        await self.users.delete_many({"userid": {"$in": userids}})
+
+    async def _bulk_write_users(self, operations: list[UpdateOne]) -> None:
+        """Run user upserts as concurrent bulk writes of bounded size.
+
+        Args:
+            operations: Upsert operations, each targeting a distinct userid.
+        """
+        # Each upsert targets a distinct userid, so the server need not apply
+        # them in order or stop at the first failure
+        await asyncio.gather(
+            *(
+                self.users.bulk_write(
+                    operations[start : start + _BULK_WRITE_CHUNK_SIZE], ordered=False
+                )
+                for start in range(0, len(operations), _BULK_WRITE_CHUNK_SIZE)
+            )
+        )
 
     async def upsert_contacts(self, contacts: list[dict[str, Any]]) -> None:
         """Bulk upsert multiple contacts in MongoDB.
@@ -121,12 +322,7 @@ class MongoDBClient:
                     },
                     "$setOnInsert": {
                         "userid": contact["userid"],
-                        "apprise_urls": [],
-                        "timezone": "Asia/Shanghai",
-                        "mention_level": MentionLevel.AVATARHOVER.value,
-                        "enable_wikidot_pm": True,
-                        "enable_email": True,
-                        "enable_apprise": False,
+                        **_CONTACT_ON_INSERT,
                     },
                 },
                 upsert=True,
@@ -134,7 +330,7 @@ class MongoDBClient:
             for contact in contacts
         ]
 
-        await self.db[COLLECTION_USERS].bulk_write(operations)
+        await self._bulk_write_users(operations)
 
     async def upsert_users(self, users: list[UserInfo]) -> None:
         """Bulk upsert multiple users in MongoDB.
@@ -152,8 +348,8 @@ class MongoDBClient:
             UpdateOne(
                 {"userid": user_info.userid},
                 {
+                    # userid is copied from the filter on insert and never changes
                     "$set": {
-                        "userid": user_info.userid,
                         "username": user_info.username,
                         "email": user_info.email,
                         "apprise_urls": user_info.apprise_urls,
@@ -169,20 +365,31 @@ class MongoDBClient:
             for user_info in users
         ]
 
-        await self.db[COLLECTION_USERS].bulk_write(operations)
+        await self._bulk_write_users(operations)
 
     # Metadata management
     async def get_metadata(self, key: str) -> Any | None:
         """Get metadata value from MongoDB.
 
+        Values already read or written by this client are served from an
+        in-process cache without a round trip.
+
         Args:
             key: Metadata key to retrieve (stored as key field).
 
         Returns:
             Metadata value or None if not found.
         """
-        result = await self.db[COLLECTION_METADATA].find_one({"key": key})
-        return result["value"] if result else None
+        if key in self._meta_cache:
+            self._meta_cache.move_to_end(key)
+            return self._meta_cache[key]
+
+        result = await self.metadata.find_one({"key": key})
+        if not result:
+            return None
+
+        self._cache_metadata(key, result["value"])
+        return result["value"]
 
     async def set_metadata(self, key: str, value: Any) -> None:
         """Set metadata value in MongoDB.
@@ -191,11 +398,24 @@ class MongoDBClient:
             key: Metadata key (stored as key field).
             value: Metadata value.
         """
-        await self.db[COLLECTION_METADATA].update_one(
+        await self.metadata.update_one(
             {"key": key},
             {"$set": {"key": key, "value": value}},
             upsert=True,
         )
+        self._cache_metadata(key, value)
+
+    def _cache_metadata(self, key: str, value: Any) -> None:
+        """Store a metadata value in the cache, evicting the oldest entry.
+
+        Args:
+            key: Metadata key.
+            value: Metadata value.
+        """
+        self._meta_cache[key] = value
+        self._meta_cache.move_to_end(key)
+        if len(self._meta_cache) > _METADATA_CACHE_SIZE:
+            self._meta_cache.popitem(last=False)
 
     async def ensure_schema_validation(self) -> None:
         """Set up schema validation for collections.
@@ -203,102 +423,55 @@ class MongoDBClient:
         Only creates collections with validation if they don't exist yet.
         If collections already exist, validation is not modified.
         """
-        # Get existing collection names
-        existing_collections = await self.db.list_collection_names()
-
-        # Schema validation for users collection
-        if COLLECTION_USERS not in existing_collections:
-            users_validator = {
-                "$jsonSchema": {
-                    "bsonType": "object",
-                    "required": ["userid", "username", "apprise_urls"],
-                    "properties": {
-                        "userid": {
-                            "bsonType": "int",
-                            "description": "User ID (unique identifier)",
-                        },
-                        "username": {
-                            "bsonType": "string",
-                            "description": "Username of the user",
-                        },
-                        "enable_wikidot_pm": {
-                            "bsonType": "bool",
-                            "description": (
-                                "Whether to enable Wikidot private message "
-                                "notifications"
-                            ),
-                        },
-                        "email": {
-                            "bsonType": ["string", "null"],
-                            "description": "User's email address (optional)",
-                        },
-                        "enable_email": {
-                            "bsonType": "bool",
-                            "description": "Whether to enable email notifications",
-                        },
-                        "apprise_urls": {
-                            "bsonType": "array",
-                            "items": {"bsonType": "string"},
-                            "description": "List of Apprise notification URLs",
-                        },
-                        "enable_apprise": {
-                            "bsonType": "bool",
-                            "description": "Whether to enable Apprise notifications",
-                        },
-                        "timezone": {
-                            "bsonType": "string",
-                            "description": (
-                                "User timezone (IANA format, e.g., 'Asia/Shanghai')"
-                            ),
-                        },
-                        "mention_level": {
-                            "bsonType": "string",
-                            "enum": ["disabled", "avatarhover", "all"],
-                            "description": (
-                                "Level of mention notifications: "
-                                "disabled, avatarhover, or all"
-                            ),
-                        },
-                    },
-                }
-            }
-            await self.db.create_collection(COLLECTION_USERS, validator=users_validator)
-            # Create indexes immediately after collection creation
-            try:
-                await self.db[COLLECTION_USERS].create_index(
-                    [("userid", 1)],
-                    unique=True,
-                )
-            except Exception as e:
-                logger.debug("Index creation for users: %s", e)
-
-        # Schema validation for metadata collection
-        if COLLECTION_METADATA not in existing_collections:
-            metadata_validator = {
-                "$jsonSchema": {
-                    "bsonType": "object",
-                    "required": ["key", "value"],
-                    "properties": {
-                        "key": {
-                            "description": "Metadata key (unique identifier)",
-                        },
-                        "value": {
-                            "description": "Metadata value (any type)",
-                        },
-                    },
-                }
-            }
-            await self.db.create_collection(
-                COLLECTION_METADATA, validator=metadata_validator
+        # Only ask the server about our own collections
+        cursor = await self.db.list_collections(
+            filter={"name": {"$in": [COLLECTION_USERS, COLLECTION_METADATA]}},
+            nameOnly=True,
+        )
+        existing_collections = {c["name"] for c in await cursor.to_list(None)}
+
+        # The two collections are independent, so set them up concurrently
+        await asyncio.gather(
+            self._ensure_users_collection(existing_collections),
+            self._ensure_metadata_collection(existing_collections),
+        )
+
+    async def _ensure_users_collection(self, existing_collections: set[str]) -> None:
+        """Create the users collection with validation and indexes if missing.
+
+        Args:
+            existing_collections: Names of collections that already exist.
+        """
+        if COLLECTION_USERS in existing_collections:
+            return
+
+        await self.db.create_collection(COLLECTION_USERS, validator=_USERS_VALIDATOR)
+        # Create indexes immediately after collection creation
+        try:
+            await self.users.create_index([("userid", 1)], unique=True)
+        except Exception as e:
+            logger.debug("Index creation for users: %s", e)
+
+    async def _ensure_metadata_collection(self, existing_collections: set[str]) -> None:
+        """Create the metadata collection with validation and index if missing.
+
+        Args:
+            existing_collections: Names of collections that already exist.
+        """
+        if COLLECTION_METADATA in existing_collections:
+            return
+
+        await self.db.create_collection(
+            COLLECTION_METADATA, validator=_METADATA_VALIDATOR
+        )
+        # Create indexes immediately after collection creation
+        try:
+            await self.metadata.create_index(
+                [("key", 1)],
+                unique=True,
             )
-            # Create indexes immediately after collection creation
-            try:
-                await self.db[COLLECTION_METADATA].create_index(
-                    [("key", 1)],
-                    unique=True,
-                )
-            except Exception as e:
-                logger.debug("Index creation for metadata: %s", e)
+        except Exception as e:
+            logger.debug("Index creation for metadata: %s", e)
 
 
 # Global MongoDB instance
@@ -316,6 +489,10 @@ async def init_mongodb() -> None:
         RuntimeError: If already initialized.
     """
     global _mongodb_instance
+    # Fail fast without the lock, then re-check once it is held
+    if _mongodb_instance is not None:
+        raise RuntimeError("MongoDB already initialized.")
+
     async with _mongodb_lock:
         if _mongodb_instance is not None:
             raise RuntimeError("MongoDB already initialized.")
@@ -328,7 +505,13 @@ async def init_mongodb() -> None:
             return
 
         # MongoDB mode: create instance and set up schema
-        _mongodb_instance = MongoDBClient(cfg.mongodb_uri)
+        _mongodb_instance = MongoDBClient(
+            cfg.mongodb_uri, users_batch_size=cfg.mongodb_batch_size
+        )
+
+        # Ping first so an unreachable server fails before any schema work,
+        # and the schema setup starts on an already open pooled connection
+        await _mongodb_instance.client.admin.command("ping")
 
         # Set up schema validation (includes index creation for new collections)
         await _mongodb_instance.ensure_schema_validation()
@@ -345,6 +528,7 @@ def get_mongodb() -> MongoDBClient:
     Raises:
         RuntimeError: If MongoDB has not been initialized.
     """
+    # Hot path: the instance is read-only once initialized, so no lock is taken
     if _mongodb_instance is None:
         raise RuntimeError("MongoDB not initialized. Call init_mongodb() first.")
     return _mongodb_instance
@@ -356,6 +540,10 @@ async def cleanup_mongodb() -> None:
     In no-database mode, this function does nothing.
     """
     global _mongodb_instance
+    # Nothing to close in no-database mode or after a previous cleanup
+    if _mongodb_instance is None:
+        return
+
     async with _mongodb_lock:
         if _mongodb_instance is not None:
             await _mongodb_instance.close()
@@ -1,5 +1,6 @@
 """Tests for Scoparia API module."""
 
+import gc
 from datetime import UTC, datetime
 from unittest.mock import AsyncMock, MagicMock, patch
 
@@ -54,6 +55,22 @@ class TestRSSForumPost:
         assert post.parents[0].text == "Category"
         assert post.parents[1].text == "Thread"
 
+    def test_rss_forum_post_not_gc_tracked(self) -> None:
+        """Test that RSSForumPost and Link are not tracked by the GC."""
+        post = RSSForumPost(
+            post_id=123,
+            thread_id=456,
+            title="Test Post",
+            link="https://example.com",
+            author_name="TestUser",
+            content="<p>Test content</p>",
+            publish_time=datetime.now(UTC),
+            site_url="https://scp-wiki.wikidot.com",
+            parents=[Link(text="Category", url="https://example.com/category")],
+        )
+        assert not gc.is_tracked(post)
+        assert not gc.is_tracked(post.parents[0])
+
 
 class TestLink:
     """Test Link struct."""
@@ -1,5 +1,6 @@
 """Tests for Scoparia configuration module."""
 
+import gc
 import os
 from unittest.mock import patch
 
@@ -98,6 +99,15 @@ class TestUserInfo:
         assert user.enable_email is True
         assert user.enable_apprise is True
 
+    def test_user_info_not_gc_tracked(self) -> None:
+        """Test that UserInfo is not tracked by the GC."""
+        user = UserInfo(
+            userid=123,
+            username="TestUser",
+            apprise_urls=["json://localhost"],
+        )
+        assert not gc.is_tracked(user)
+
 
 class TestLoadConfigFromEnv:
     """Test loading configuration from environment variables."""
@@ -126,6 +136,12 @@ class TestLoadConfigFromEnv:
             assert 123 in config.users
             assert config.users[123].username == "TestUser"
 
+        # The parsed users and URLs are shared through the config cache, so
+        # read-only
+        with pytest.raises(TypeError):
+            config.users[456] = config.users[123]  # type: ignore[index]
+        assert isinstance(config.rss_site_urls, tuple)
+
     def test_load_config_no_database_mode(self) -> None:
         """Test loading config in no-database mode."""
         env_vars = {
@@ -144,6 +160,24 @@ class TestLoadConfigFromEnv:
             assert config.mongodb_uri is None
             assert len(config.users) == 1
 
+    def test_load_config_cached(self) -> None:
+        """Test that an unchanged environment reuses the parsed config."""
+        env_vars = {
+            "WIKIDOT_USERNAME": "test_user",
+            "WIKIDOT_PASSWORD": "test_password",
+            "RSS_SITE_URLS": '["https://scp-wiki.wikidot.com"]',
+            "MONGODB_URI": "mongodb://localhost:27017",
+        }
+        with patch.dict(os.environ, env_vars):
+            first = load_config_from_env()
+            assert load_config_from_env() is first
+
+            # A changed value produces a freshly parsed config
+            os.environ["RSS_SITE_URLS"] = '["https://scp-int.wikidot.com"]'
+            second = load_config_from_env()
+            assert second is not first
+            assert second.rss_site_urls == ("https://scp-int.wikidot.com",)
+
     def test_load_config_missing_username(self) -> None:
         """Test that missing WIKIDOT_USERNAME raises ValueError."""
         env_vars = {
@@ -240,6 +274,23 @@ class TestLoadConfigFromEnv:
             assert "https://scp-wiki.wikidot.com" in config.rss_site_urls
             assert "https://scp-wiki-cn.wikidot.com" in config.rss_site_urls
 
+    def test_load_config_rss_url_with_newline(self) -> None:
+        """Test that a URL hiding two URLs behind a newline is rejected."""
+        env_vars = {
+            "WIKIDOT_USERNAME": "test_user",
+            "WIKIDOT_PASSWORD": "test_password",
+            "RSS_SITE_URLS": (
+                '["https://scp-wiki.wikidot.com\\nhttps://scp-int.wikidot.com", '
+                '"not-a-url"]'
+            ),
+            "MONGODB_URI": "mongodb://localhost:27017",
+        }
+        with (
+            patch.dict(os.environ, env_vars),
+            pytest.raises(ValueError, match="Invalid RSS site URL format"),
+        ):
+            load_config_from_env()
+
     def test_load_config_invalid_users_json(self) -> None:
         """Test that invalid USERS_JSON raises ValueError."""
         env_vars = {
@@ -254,6 +305,94 @@ class TestLoadConfigFromEnv:
         ):
             load_config_from_env()
 
+    def test_load_config_mongodb_batch_size(self) -> None:
+        """Test reading the MongoDB batch size, with its default when unset."""
+        env_vars = {
+            "WIKIDOT_USERNAME": "test_user",
+            "WIKIDOT_PASSWORD": "test_password",
+            "RSS_SITE_URLS": '["https://scp-wiki.wikidot.com"]',
+            "MONGODB_URI": "mongodb://localhost:27017",
+        }
+        with patch.dict(os.environ, env_vars, clear=True):
+            assert load_config_from_env().mongodb_batch_size == 1000
+
+            os.environ["SCOPARIA_MONGODB_BATCH_SIZE"] = "250"
+            assert load_config_from_env().mongodb_batch_size == 250
+
+    def test_load_config_email_batch_size(self) -> None:
+        """Test reading the email batch size and rejecting values below 1."""
+        env_vars = {
+            "WIKIDOT_USERNAME": "test_user",
+            "WIKIDOT_PASSWORD": "test_password",
+            "RSS_SITE_URLS": '["https://scp-wiki.wikidot.com"]',
+            "MONGODB_URI": "mongodb://localhost:27017",
+        }
+        with patch.dict(os.environ, env_vars, clear=True):
+            assert load_config_from_env().email_batch_size == 500
+
+            os.environ["SCOPARIA_EMAIL_BATCH_SIZE"] = "50"
+            assert load_config_from_env().email_batch_size == 50
+
+            os.environ["SCOPARIA_EMAIL_BATCH_SIZE"] = "0"
+            with pytest.raises(ValueError, match="SCOPARIA_EMAIL_BATCH_SIZE must be"):
+                load_config_from_env()
+
+    def test_load_config_email_concurrency(self) -> None:
+        """Test reading the email concurrency and rejecting values below 1."""
+        env_vars = {
+            "WIKIDOT_USERNAME": "test_user",
+            "WIKIDOT_PASSWORD": "test_password",
+            "RSS_SITE_URLS": '["https://scp-wiki.wikidot.com"]',
+            "MONGODB_URI": "mongodb://localhost:27017",
+        }
+        with patch.dict(os.environ, env_vars, clear=True):
+            assert load_config_from_env().email_concurrency == 4
+
+            os.environ["SCOPARIA_EMAIL_CONCURRENCY"] = "2"
+            assert load_config_from_env().email_concurrency == 2
+
+            os.environ["SCOPARIA_EMAIL_CONCURRENCY"] = "0"
+            with pytest.raises(ValueError, match="SCOPARIA_EMAIL_CONCURRENCY must be"):
+                load_config_from_env()
+
+    @pytest.mark.parametrize(
+        ("value", "message"),
+        [
+            pytest.param("abc", "must be an integer", id="not_integer"),
+            pytest.param("0", "must be at least 1", id="zero"),
+            pytest.param("-5", "must be at least 1", id="negative"),
+        ],
+    )
+    def test_load_config_invalid_mongodb_batch_size(
+        self, value: str, message: str
+    ) -> None:
+        """Test that a non-positive or non-integer batch size raises ValueError."""
+        env_vars = {
+            "WIKIDOT_USERNAME": "test_user",
+            "WIKIDOT_PASSWORD": "test_password",
+            "RSS_SITE_URLS": '["https://scp-wiki.wikidot.com"]',
+            "MONGODB_URI": "mongodb://localhost:27017",
+            "SCOPARIA_MONGODB_BATCH_SIZE": value,
+        }
+        with (
+            patch.dict(os.environ, env_vars),
+            pytest.raises(ValueError, match=f"SCOPARIA_MONGODB_BATCH_SIZE {message}"),
+        ):
+            load_config_from_env()
+
+    def test_load_config_from_mapping(self) -> None:
+        """Test that a given env mapping is read instead of os.environ."""
+        env_vars = {
+            "WIKIDOT_USERNAME": "mapped_user",
+            "WIKIDOT_PASSWORD": "test_password",
+            "RSS_SITE_URLS": '["https://scp-wiki.wikidot.com"]',
+            "MONGODB_URI": "mongodb://localhost:27017",
+        }
+        with patch.dict(os.environ, {"WIKIDOT_USERNAME": "environ_user"}):
+            config = load_config_from_env(env_vars)
+        assert config.wikidot_username == "mapped_user"
+        assert config.mongodb_uri == "mongodb://localhost:27017"
+
 
 class TestScopariaConfig:
     """Test ScopariaConfig struct."""
@@ -271,7 +410,7 @@ class TestScopariaConfig:
             wikidot_username="test_user",
             wikidot_password="test_password",
             mongodb_uri="mongodb://localhost:27017",
-            rss_site_urls=["https://scp-wiki.wikidot.com"],
+            rss_site_urls=("https://scp-wiki.wikidot.com",),
             users=users,
         )
         assert config.wikidot_username == "test_user"
@@ -293,7 +432,7 @@ class TestScopariaConfig:
             wikidot_username="test_user",
             wikidot_password="test_password",
             mongodb_uri=None,
-            rss_site_urls=["https://scp-wiki.wikidot.com"],
+            rss_site_urls=("https://scp-wiki.wikidot.com",),
             users=users,
         )
         assert config.mongodb_uri is None
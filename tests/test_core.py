@@ -1,9 +1,14 @@
 """Tests for Scoparia core module."""
 
+import asyncio
+import os
 from collections import defaultdict
+from collections.abc import Callable, Coroutine
 from datetime import UTC, datetime
+from typing import Any
 from unittest.mock import AsyncMock, MagicMock, patch
 
+import msgspec
 import pytest
 
 from scoparia.api import RSSForumPost
@@ -11,6 +16,15 @@ from scoparia.config import MentionLevel, UserInfo
 from scoparia.core import ScopariaCore
 
 
+def _returning(value: Any = None) -> Callable[..., Coroutine[Any, Any, Any]]:
+    """Build a bare coroutine function returning value, for unasserted mocks."""
+
+    async def _coroutine(*args: Any, **kwargs: Any) -> Any:
+        return value
+
+    return _coroutine
+
+
 class TestScopariaCore:
     """Test ScopariaCore class."""
 
@@ -160,6 +174,87 @@ class TestScopariaCore:
         core._check_mentions(post, users, users_to_notify)
         assert 123 not in users_to_notify
 
+    @pytest.mark.asyncio
+    async def test_check_mentions_multiple_users(self, core: ScopariaCore) -> None:
+        """Test that each mention is attributed to its own user."""
+        users = {
+            123: UserInfo(
+                userid=123,
+                username="TestUser",
+                apprise_urls=[],
+                mention_level=MentionLevel.AVATARHOVER,
+            ),
+            456: UserInfo(
+                userid=456,
+                username="OtherUser",
+                apprise_urls=[],
+                mention_level=MentionLevel.AVATARHOVER,
+            ),
+        }
+        users_to_notify = set[int]()
+
+        # A guest mention without a user link, then two user mentions
+        post = MagicMock()
+        post.text = (
+            '<p><span class="printuser avatarhover">Guest</span> and '
+            '<span class="printuser">'
+            '<a href="https://www.wikidot.com/user:info/testuser" '
+            'onclick="WIKIDOT.page.listeners.userInfo(123); return false;">'
+            "TestUser</a></span> and "
+            '<span class="printuser avatarhover">'
+            '<a href="https://www.wikidot.com/user:info/otheruser" '
+            'onclick="WIKIDOT.page.listeners.userInfo(456); return false;">'
+            '<img class="small" src="avatar.png" alt="OtherUser"/></a>'
+            '<a href="https://www.wikidot.com/user:info/otheruser" '
+            'onclick="WIKIDOT.page.listeners.userInfo(456); return false;">'
+            "OtherUser</a></span></p>"
+        )
+
+        core._check_mentions(post, users, users_to_notify)
+        assert users_to_notify == {456}
+
+    @pytest.mark.asyncio
+    async def test_check_mentions_all_users_notified(self, core: ScopariaCore) -> None:
+        """Test that mentions are not parsed once all users are notified."""
+        users = {
+            123: UserInfo(
+                userid=123,
+                username="TestUser",
+                apprise_urls=[],
+                mention_level=MentionLevel.ALL,
+            )
+        }
+        users_to_notify = {123}
+
+        post = MagicMock()
+        post.text = '<span class="printuser">TestUser</span>'
+
+        with patch("scoparia.core._MENTION_RE") as mock_mention_re:
+            core._check_mentions(post, users, users_to_notify)
+            mock_mention_re.finditer.assert_not_called()
+        assert users_to_notify == {123}
+
+    @pytest.mark.asyncio
+    async def test_check_mentions_no_printuser(self, core: ScopariaCore) -> None:
+        """Test that posts without user mentions skip the regex scan."""
+        users = {
+            123: UserInfo(
+                userid=123,
+                username="TestUser",
+                apprise_urls=[],
+                mention_level=MentionLevel.ALL,
+            )
+        }
+        users_to_notify = set[int]()
+
+        post = MagicMock()
+        post.text = "<p>No mentions here</p>"
+
+        with patch("scoparia.core._MENTION_RE") as mock_mention_re:
+            core._check_mentions(post, users, users_to_notify)
+            mock_mention_re.finditer.assert_not_called()
+        assert users_to_notify == set()
+
     @pytest.mark.asyncio
     async def test_check_reply_to_user_post(
         self, core: ScopariaCore, sample_users: dict[int, UserInfo]
@@ -200,6 +295,110 @@ class TestScopariaCore:
         await core._check_reply(post, thread, sample_users, users_to_notify)
         assert 123 in users_to_notify
 
+    @pytest.mark.asyncio
+    async def test_check_reply_skips_page_author_when_all_notified(
+        self, core: ScopariaCore, sample_users: dict[int, UserInfo]
+    ) -> None:
+        """Test that the page author is not fetched once all users are notified."""
+        users_to_notify = {456}
+
+        post = MagicMock()
+        post.parents = []
+
+        thread = MagicMock()
+        thread.created_by = MagicMock()
+        thread.created_by.id = 123
+        thread.page_fullname = "scp-173"
+
+        with patch(
+            "scoparia.core.get_page_author_id_from_crom", new_callable=AsyncMock
+        ) as mock_crom:
+            await core._check_reply(post, thread, sample_users, users_to_notify)
+
+        assert users_to_notify == {123, 456}
+        mock_crom.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_check_post_for_users_returns_users(
+        self,
+        core: ScopariaCore,
+        sample_users: dict[int, UserInfo],
+        sample_rss_post: RSSForumPost,
+        sample_forum_post: MagicMock,
+        sample_forum_thread: MagicMock,
+    ) -> None:
+        """Test that check_post_for_users returns users without shared state."""
+        sample_forum_thread.created_by.id = 123
+        sample_forum_thread.get_post_by_id = _returning(sample_forum_post)
+
+        with patch(
+            "scoparia.core.ForumThread.get_from_id",
+            _returning(sample_forum_thread),
+        ):
+            users_to_notify = await core.check_post_for_users(
+                sample_rss_post, sample_users
+            )
+
+        assert users_to_notify == {123}
+        assert len(sample_rss_post.parents) == 2
+        assert len(core.all_user_notifications) == 0
+
+    @pytest.mark.asyncio
+    async def test_check_post_for_users_large_post_in_thread(
+        self,
+        core: ScopariaCore,
+        sample_users: dict[int, UserInfo],
+        sample_rss_post: RSSForumPost,
+        sample_forum_post: MagicMock,
+        sample_forum_thread: MagicMock,
+    ) -> None:
+        """Test that oversized posts are scanned for mentions off the loop."""
+        sample_forum_post.text = (
+            '<span class="printuser avatarhover">'
+            '<a href="https://www.wikidot.com/user:info/testuser" '
+            'onclick="WIKIDOT.page.listeners.userInfo(123); return false;">'
+            "TestUser</a></span>"
+        )
+        sample_forum_thread.get_post_by_id = _returning(sample_forum_post)
+
+        with (
+            patch(
+                "scoparia.core.ForumThread.get_from_id",
+                _returning(sample_forum_thread),
+            ),
+            patch("scoparia.core._MENTION_SCAN_THREAD_THRESHOLD", 10),
+            patch(
+                "scoparia.core.asyncio.to_thread", wraps=asyncio.to_thread
+            ) as mock_to_thread,
+        ):
+            users_to_notify = await core.check_post_for_users(
+                sample_rss_post, sample_users
+            )
+
+        assert users_to_notify == {123}
+        mock_to_thread.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_check_post_for_users_post_not_found(
+        self,
+        core: ScopariaCore,
+        sample_users: dict[int, UserInfo],
+        sample_rss_post: RSSForumPost,
+        sample_forum_thread: MagicMock,
+    ) -> None:
+        """Test that a missing post yields no users to notify."""
+        sample_forum_thread.get_post_by_id = _returning(None)
+
+        with patch(
+            "scoparia.core.ForumThread.get_from_id",
+            _returning(sample_forum_thread),
+        ):
+            users_to_notify = await core.check_post_for_users(
+                sample_rss_post, sample_users
+            )
+
+        assert users_to_notify == set()
+
     @pytest.mark.asyncio
     async def test_send_email_notification(
         self, core: ScopariaCore, sample_users: dict[int, UserInfo]
@@ -220,13 +419,18 @@ class TestScopariaCore:
             )
         ]
 
-        with patch("scoparia.core.send_email") as mock_send_email:
-            mock_send_email.return_value = True
-            core._send_email_notification(user_info, posts)
-            mock_send_email.assert_called_once()
-            call_args = mock_send_email.call_args
-            assert call_args.kwargs["to_email"] == "test@example.com"
-            assert call_args.kwargs["title"] == "[Scoparia] New post"
+        user_info = msgspec.structs.replace(
+            user_info, enable_apprise=False, enable_wikidot_pm=False
+        )
+
+        with patch(
+            "scoparia.core.send_email_many", AsyncMock(return_value=[True])
+        ) as mock_send_email_many:
+            await core.send_all_notifications(user_info, posts)
+            mock_send_email_many.assert_awaited_once()
+            [(title, _, to_email)] = mock_send_email_many.call_args.args[0]
+            assert to_email == "test@example.com"
+            assert title == "[Scoparia] New post"
 
     @pytest.mark.asyncio
     async def test_send_email_notification_no_email(
@@ -247,10 +451,13 @@ class TestScopariaCore:
                 parents=[],
             )
         ]
+        user_info = msgspec.structs.replace(
+            user_info, enable_email=True, enable_wikidot_pm=False
+        )
 
-        with patch("scoparia.core.send_email") as mock_send_email:
-            core._send_email_notification(user_info, posts)
-            mock_send_email.assert_not_called()
+        with patch("scoparia.core.send_email_many") as mock_send_email_many:
+            await core.send_all_notifications(user_info, posts)
+            mock_send_email_many.assert_not_called()
 
     @pytest.mark.asyncio
     async def test_send_wikidot_pm_notification(
@@ -305,7 +512,9 @@ class TestScopariaCore:
 
         with (
             patch("scoparia.core.get_client") as mock_get_client,
-            patch("scoparia.core.send_email") as mock_send_email,
+            patch(
+                "scoparia.core.send_email_many", AsyncMock(return_value=[True])
+            ) as mock_send_email_many,
             patch("scoparia.core.generate_formatter") as mock_formatter,
             patch("scoparia.core.apprise"),
             patch.object(core, "_send_apprise_notification") as mock_send_apprise,
@@ -315,9 +524,6 @@ class TestScopariaCore:
             mock_client.send_private_message.return_value = True
             mock_get_client.return_value = mock_client
 
-            # Mock email
-            mock_send_email.return_value = True
-
             # Mock apprise notification method
             mock_send_apprise.return_value = None
 
@@ -333,7 +539,7 @@ class TestScopariaCore:
 
             # Verify all channels were called
             mock_client.send_private_message.assert_called_once()
-            mock_send_email.assert_called_once()
+            mock_send_email_many.assert_awaited_once()
             mock_send_apprise.assert_called_once()
 
     @pytest.mark.asyncio
@@ -366,7 +572,7 @@ class TestScopariaCore:
 
         with (
             patch("scoparia.core.get_client") as mock_get_client,
-            patch("scoparia.core.send_email") as mock_send_email,
+            patch("scoparia.core.send_email_many") as mock_send_email_many,
             patch("scoparia.core.apprise"),
         ):
             mock_client = AsyncMock()
@@ -376,13 +582,150 @@ class TestScopariaCore:
 
             # Verify no channels were called
             mock_client.send_private_message.assert_not_called()
-            mock_send_email.assert_not_called()
+            mock_send_email_many.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_process_rss_feed_site_failure(
+        self,
+        core: ScopariaCore,
+        sample_users: dict[int, UserInfo],
+        sample_rss_post: RSSForumPost,
+    ) -> None:
+        """Test that a failed site keeps its timestamp while others are updated."""
+        good_site = "https://scp-wiki.wikidot.com"
+        bad_site = "https://scp-wiki-cn.wikidot.com"
+        build_date = datetime(2023, 1, 2, tzinfo=UTC)
+
+        mock_config = MagicMock()
+        mock_config.mongodb_uri = None
+        mock_config.users = sample_users
+        mock_config.rss_site_urls = (good_site, bad_site)
+
+        async def fetch_rss_posts(site_url: str, since: datetime):
+            if site_url == bad_site:
+                raise RuntimeError("Feed unavailable")
+            return [sample_rss_post], build_date
+
+        mock_client = MagicMock()
+        mock_client.fetch_rss_posts = fetch_rss_posts
+
+        last_check = (
+            '{"https://scp-wiki.wikidot.com": "2023-01-01T00:00:00Z", '
+            '"https://scp-wiki-cn.wikidot.com": "2023-01-01T00:00:00Z"}'
+        )
+
+        with (
+            patch.dict(os.environ, {"LAST_RSS_CHECK": last_check}),
+            patch("scoparia.core.get_config", return_value=mock_config),
+            patch("scoparia.core.get_client", return_value=mock_client),
+            patch("scoparia.core.set_github_variable") as mock_set_variable,
+            patch.object(
+                core, "check_post_for_users", AsyncMock(return_value={123})
+            ) as mock_check_post,
+            patch.object(core, "send_all_notifications") as mock_send_all,
+        ):
+            await core.process_rss_feed()
+
+        mock_check_post.assert_called_once_with(sample_rss_post, sample_users)
+        mock_send_all.assert_called_once()
+        assert mock_send_all.call_args.args[:2] == (
+            sample_users[123],
+            [sample_rss_post],
+        )
+
+        timestamps = msgspec.json.decode(
+            mock_set_variable.call_args[0][1], type=dict[str, datetime]
+        )
+        assert timestamps[good_site] == build_date
+        assert timestamps[bad_site] == datetime(2023, 1, 1, tzinfo=UTC)
+
+    @pytest.mark.asyncio
+    async def test_send_all_notifications_batches_identical_emails(
+        self, core: ScopariaCore, sample_rss_post: RSSForumPost
+    ) -> None:
+        """Test that identical email notifications are sent as one email."""
+        users = [
+            UserInfo(
+                userid=userid,
+                username=f"User{userid}",
+                apprise_urls=[],
+                email=f"user{userid}@example.com",
+                enable_wikidot_pm=False,
+                enable_apprise=False,
+            )
+            for userid in (1, 2)
+        ]
+        other_tz_user = UserInfo(
+            userid=3,
+            username="User3",
+            apprise_urls=[],
+            timezone="Asia/Shanghai",
+            email="user3@example.com",
+            enable_wikidot_pm=False,
+            enable_apprise=False,
+        )
+
+        with patch(
+            "scoparia.core.send_email_many", new_callable=AsyncMock
+        ) as mock_send_email_many:
+            mock_send_email_many.return_value = [True, True]
+            email_batch = {}
+            for user_info in [*users, other_tz_user]:
+                await core.send_all_notifications(
+                    user_info, [sample_rss_post], email_batch
+                )
+            mock_send_email_many.assert_not_called()
+
+            await core._flush_email_batch(email_batch)
+
+        mock_send_email_many.assert_called_once()
+        messages = mock_send_email_many.call_args.args[0]
+        recipients = [to_email for _, _, to_email in messages]
+        assert ["user1@example.com", "user2@example.com"] in recipients
+        assert "user3@example.com" in recipients
+        assert email_batch == {}
+
+    @pytest.mark.asyncio
+    async def test_send_all_notifications_bulk(
+        self,
+        core: ScopariaCore,
+        sample_users: dict[int, UserInfo],
+        sample_rss_post: RSSForumPost,
+    ) -> None:
+        """Test that every user is notified and emails are flushed once."""
+        with (
+            patch.object(
+                core,
+                "send_all_notifications",
+                AsyncMock(side_effect=[RuntimeError("PM failed"), None]),
+            ) as mock_send_all,
+            patch.object(core, "_flush_email_batch") as mock_flush,
+        ):
+            await core.send_all_notifications_bulk(
+                sample_users, {123: [sample_rss_post], 456: [sample_rss_post]}
+            )
+
+        # A failure for one user does not stop the others
+        assert mock_send_all.call_count == 2
+        notified = [call.args[0] for call in mock_send_all.call_args_list]
+        assert notified == [sample_users[123], sample_users[456]]
+        mock_flush.assert_called_once()
 
     def test_all_user_notifications_initialization(self, core: ScopariaCore) -> None:
         """Test that all_user_notifications is initialized correctly."""
         assert isinstance(core.all_user_notifications, defaultdict)
         assert len(core.all_user_notifications) == 0
 
+    def test_bulk_extend(
+        self, core: ScopariaCore, sample_rss_post: RSSForumPost
+    ) -> None:
+        """Test that one post is queued for every given user."""
+        core._bulk_extend({123, 456}, sample_rss_post)
+        core._bulk_extend([123], sample_rss_post)
+
+        assert core.all_user_notifications[123] == [sample_rss_post, sample_rss_post]
+        assert core.all_user_notifications[456] == [sample_rss_post]
+
     def test_all_user_notifications_cleared(
         self, core: ScopariaCore, sample_users: dict[int, UserInfo]
     ) -> None:
@@ -1,181 +1,303 @@
 """Tests for Scoparia CROM API module."""
 
-from unittest.mock import AsyncMock, MagicMock, patch
+import itertools
+from collections.abc import Iterator
+from unittest.mock import AsyncMock, MagicMock
 
 import aiohttp
+import msgspec
 import pytest
 
-from scoparia.crom import get_page_author_id_from_crom
+from scoparia import crom
+from scoparia.crom import cleanup_crom, get_page_author_id_from_crom
+
+# The tests only use mocks, so they share one event loop for the module
+pytestmark = pytest.mark.asyncio(loop_scope="module")
+
+# Base64 encoded JSON: {"type":"WikidotUser","id":"1234567"}
+_ENCODED_ID = "eyJ0eXBlIjogIldpa2lkb3RVc2VyIiwgImlkIjogIjEyMzQ1NjcifQ=="
+# Base64 encoded JSON: {"type":"WikidotUser","id":"8366274"}
+_COMPACT_ENCODED_ID = "eyJ0eXBlIjoiV2lraWRvdFVzZXIiLCJpZCI6IjgzNjYyNzQifQ=="
+
+
+def _payload(created_by: dict[str, str] | None) -> bytes:
+    """Encode a CROM wikidotPage response with the given createdBy."""
+    return msgspec.json.encode({"data": {"wikidotPage": {"createdBy": created_by}}})
+
+
+_SUCCESS_PAYLOAD = _payload({"id": _ENCODED_ID})
+_COMPACT_PAYLOAD = _payload({"id": _COMPACT_ENCODED_ID})
+_DELETED_PAYLOAD = _payload(None)
+_EMPTY_PAYLOAD = msgspec.json.encode({"data": {}})
+
+
+class _FakeResponse:
+    """Lightweight stand-in for an aiohttp response."""
+
+    def __init__(
+        self,
+        payload: bytes = b"",
+        status: int = 200,
+        headers: dict[str, str] | None = None,
+    ) -> None:
+        self.payload = payload
+        self.status = status
+        self.headers = headers or {}
+
+    def raise_for_status(self) -> None:
+        """Raise for error statuses, as aiohttp responses do."""
+        if self.status >= 400:
+            raise aiohttp.ClientResponseError(
+                MagicMock(), (), status=self.status, headers=self.headers
+            )
+
+    async def read(self) -> bytes:
+        """Return the response payload."""
+        return self.payload
+
+
+class _FakeRequest:
+    """Request context manager yielding a response or raising an error."""
+
+    def __init__(self, outcome: _FakeResponse | BaseException) -> None:
+        self.outcome = outcome
+
+    async def __aenter__(self) -> _FakeResponse:
+        if isinstance(self.outcome, BaseException):
+            raise self.outcome
+        return self.outcome
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        return None
+
+
+class _MockCromSession:
+    """Mocked shared CROM session whose post() yields the configured responses."""
+
+    def __init__(self) -> None:
+        self._outcomes: Iterator[_FakeResponse | BaseException] = iter(())
+
+        # Only post() is tracked, the requests themselves are plain fakes
+        self.session = MagicMock()
+        self.session.post = MagicMock(side_effect=self._post)
+
+    def _post(self, *args: object, **kwargs: object) -> _FakeRequest:
+        return _FakeRequest(next(self._outcomes))
+
+    def set_response(self, payload: bytes) -> None:
+        """Answer every request with a successful response carrying payload."""
+        self._outcomes = itertools.repeat(_FakeResponse(payload))
+
+    def set_responses(self, *responses: _FakeResponse) -> None:
+        """Answer successive requests with the given responses."""
+        self._outcomes = iter(responses)
+
+    def set_error(self, error: BaseException) -> None:
+        """Fail every request with error."""
+        self._outcomes = itertools.repeat(error)
+
+
+@pytest.fixture
+def crom_session(monkeypatch: pytest.MonkeyPatch) -> _MockCromSession:
+    """Fixture replacing the shared CROM session with a mock."""
+    mock = _MockCromSession()
+    monkeypatch.setattr(crom, "_author_cache", {})
+    monkeypatch.setattr(crom, "_get_session", lambda: mock.session)
+    return mock
 
 
 class TestGetPageAuthorIdFromCrom:
     """Test get_page_author_id_from_crom function."""
 
-    @pytest.mark.asyncio
-    async def test_get_page_author_id_success(self) -> None:
-        """Test successfully getting page author ID from CROM API."""
-        # Mock response data
-        # Base64 encoded JSON: {"type":"WikidotUser","id":"1234567"}
-        encoded_id = "eyJ0eXBlIjogIldpa2lkb3RVc2VyIiwgImlkIjogIjEyMzQ1NjcifQ=="
-
-        # Mock the response
-        mock_response = AsyncMock()
-        mock_response.status = 200
-        mock_response.raise_for_status = MagicMock()
-        mock_response.read = AsyncMock(
-            return_value=f'{{"data":{{"wikidotPage":{{"createdBy":{{"id":"{encoded_id}"}}}}}}}}'.encode()
-        )
-
-        # Mock the retry client
-        mock_retry_client = AsyncMock()
-        mock_retry_client.__aenter__ = AsyncMock(return_value=mock_response)
-        mock_retry_client.__aexit__ = AsyncMock(return_value=None)
-        mock_retry_client.post = MagicMock(return_value=mock_retry_client)
-
-        with (
-            patch("scoparia.crom.RetryClient") as mock_retry_client_class,
-            patch("scoparia.crom.aiohttp.ClientSession") as mock_session_class,
-        ):
-            mock_retry_client_class.return_value = mock_retry_client
-            mock_session = AsyncMock()
-            mock_session.__aenter__ = AsyncMock(return_value=mock_session)
-            mock_session.__aexit__ = AsyncMock(return_value=None)
-            mock_session_class.return_value = mock_session
+    @pytest.mark.parametrize(
+        ("payload", "expected", "raises"),
+        [
+            pytest.param(_SUCCESS_PAYLOAD, 1234567, None, id="success"),
+            pytest.param(_COMPACT_PAYLOAD, 8366274, None, id="compact_id"),
+            pytest.param(_DELETED_PAYLOAD, None, None, id="deleted_account"),
+            pytest.param(_EMPTY_PAYLOAD, None, (KeyError, TypeError), id="key_error"),
+        ],
+    )
+    async def test_get_page_author_id(
+        self,
+        crom_session: _MockCromSession,
+        payload: bytes,
+        expected: int | None,
+        raises: tuple[type[Exception], ...] | None,
+    ) -> None:
+        """Test decoding the author ID from a CROM response payload."""
+        crom_session.set_response(payload)
 
+        if raises is None:
             result = await get_page_author_id_from_crom(
                 "https://scp-wiki.wikidot.com", "scp-173"
             )
+            assert result == expected
+        else:
+            with pytest.raises(raises):
+                await get_page_author_id_from_crom(
+                    "https://scp-wiki.wikidot.com", "scp-173"
+                )
 
-            assert result == 1234567
+        # The HTTPS site URL is always queried over HTTP
+        body = msgspec.json.decode(crom_session.session.post.call_args.kwargs["data"])
+        variables = body["variables"]
+        assert variables["url"].startswith("http://scp-wiki.wikidot.com")
 
-    @pytest.mark.asyncio
-    async def test_get_page_author_id_deleted_account(self) -> None:
-        """Test getting page author ID when account is deleted."""
-        # Mock response with null createdBy
-        mock_response = AsyncMock()
-        mock_response.status = 200
-        mock_response.raise_for_status = MagicMock()
-        mock_response.read = AsyncMock(
-            return_value=b'{"data":{"wikidotPage":{"createdBy":null}}}'
-        )
+    async def test_get_page_author_id_http_client_error(
+        self, crom_session: _MockCromSession
+    ) -> None:
+        """Test handling HTTP client errors."""
+        crom_session.set_error(aiohttp.ClientError("Connection error"))
 
-        # Mock the retry client
-        mock_retry_client = AsyncMock()
-        mock_retry_client.__aenter__ = AsyncMock(return_value=mock_response)
-        mock_retry_client.__aexit__ = AsyncMock(return_value=None)
-        mock_retry_client.post = MagicMock(return_value=mock_retry_client)
-
-        with (
-            patch("scoparia.crom.RetryClient") as mock_retry_client_class,
-            patch("scoparia.crom.aiohttp.ClientSession") as mock_session_class,
-        ):
-            mock_retry_client_class.return_value = mock_retry_client
-            mock_session = AsyncMock()
-            mock_session.__aenter__ = AsyncMock(return_value=mock_session)
-            mock_session.__aexit__ = AsyncMock(return_value=None)
-            mock_session_class.return_value = mock_session
+        with pytest.raises(aiohttp.ClientError):
+            await get_page_author_id_from_crom(
+                "https://scp-wiki.wikidot.com", "scp-173"
+            )
 
+    async def test_get_page_author_id_cached(
+        self, crom_session: _MockCromSession
+    ) -> None:
+        """Test that repeated lookups of a page reuse the cached author."""
+        crom_session.set_response(_SUCCESS_PAYLOAD)
+
+        for _ in range(2):
             result = await get_page_author_id_from_crom(
                 "https://scp-wiki.wikidot.com", "scp-173"
             )
+            assert result == 1234567
 
-            assert result is None
+        assert crom_session.session.post.call_count == 1
 
-    @pytest.mark.asyncio
-    async def test_get_page_author_id_http_client_error(self) -> None:
-        """Test handling HTTP client errors."""
-        # Mock the retry client to raise ClientError
-        mock_retry_client = AsyncMock()
-        mock_retry_client.__aenter__ = AsyncMock(
-            side_effect=aiohttp.ClientError("Connection error")
+    async def test_get_page_author_id_error_not_cached(
+        self, crom_session: _MockCromSession
+    ) -> None:
+        """Test that a failed lookup is retried on the next call."""
+        crom_session.set_responses(
+            _FakeResponse(_EMPTY_PAYLOAD), _FakeResponse(_SUCCESS_PAYLOAD)
         )
-        mock_retry_client.__aexit__ = AsyncMock(return_value=None)
-        mock_retry_client.post = MagicMock(return_value=mock_retry_client)
-
-        with (
-            patch("scoparia.crom.RetryClient") as mock_retry_client_class,
-            patch("scoparia.crom.aiohttp.ClientSession") as mock_session_class,
-        ):
-            mock_retry_client_class.return_value = mock_retry_client
-            mock_session = AsyncMock()
-            mock_session.__aenter__ = AsyncMock(return_value=mock_session)
-            mock_session.__aexit__ = AsyncMock(return_value=None)
-            mock_session_class.return_value = mock_session
-
-            with pytest.raises(aiohttp.ClientError):
-                await get_page_author_id_from_crom(
-                    "https://scp-wiki.wikidot.com", "scp-173"
-                )
 
-    @pytest.mark.asyncio
-    async def test_get_page_author_id_key_error(self) -> None:
-        """Test handling KeyError when response structure is invalid."""
-        # Mock response with missing data
-        mock_response = AsyncMock()
-        mock_response.status = 200
-        mock_response.raise_for_status = MagicMock()
-        mock_response.read = AsyncMock(return_value=b'{"data":{}}')
-
-        # Mock the retry client
-        mock_retry_client = AsyncMock()
-        mock_retry_client.__aenter__ = AsyncMock(return_value=mock_response)
-        mock_retry_client.__aexit__ = AsyncMock(return_value=None)
-        mock_retry_client.post = MagicMock(return_value=mock_retry_client)
-
-        with (
-            patch("scoparia.crom.RetryClient") as mock_retry_client_class,
-            patch("scoparia.crom.aiohttp.ClientSession") as mock_session_class,
-        ):
-            mock_retry_client_class.return_value = mock_retry_client
-            mock_session = AsyncMock()
-            mock_session.__aenter__ = AsyncMock(return_value=mock_session)
-            mock_session.__aexit__ = AsyncMock(return_value=None)
-            mock_session_class.return_value = mock_session
-
-            with pytest.raises((KeyError, TypeError)):
-                await get_page_author_id_from_crom(
-                    "https://scp-wiki.wikidot.com", "scp-173"
-                )
+        with pytest.raises((KeyError, TypeError)):
+            await get_page_author_id_from_crom(
+                "https://scp-wiki.wikidot.com", "scp-173"
+            )
+        result = await get_page_author_id_from_crom(
+            "https://scp-wiki.wikidot.com", "scp-173"
+        )
+
+        assert result == 1234567
+        assert crom_session.session.post.call_count == 2
+
+    async def test_get_page_author_id_cache_eviction(
+        self, monkeypatch: pytest.MonkeyPatch, crom_session: _MockCromSession
+    ) -> None:
+        """Test that the oldest cached page is evicted when the cache is full."""
+        monkeypatch.setattr(crom, "CROM_AUTHOR_CACHE_SIZE", 2)
+        crom_session.set_response(_SUCCESS_PAYLOAD)
+
+        for page in ("scp-173", "scp-049", "scp-096"):
+            await get_page_author_id_from_crom("https://scp-wiki.wikidot.com", page)
+
+        assert list(crom._author_cache) == [
+            "http://scp-wiki.wikidot.com/scp-049",
+            "http://scp-wiki.wikidot.com/scp-096",
+        ]
 
-    @pytest.mark.asyncio
-    async def test_get_page_author_id_https_to_http(self) -> None:
-        """Test that HTTPS URLs are converted to HTTP for CROM API."""
-        # Mock response
-        # Base64 encoded JSON: {"type":"WikidotUser","id":"1234567"}
-        encoded_id = "eyJ0eXBlIjogIldpa2lkb3RVc2VyIiwgImlkIjogIjEyMzQ1NjcifQ=="
-
-        mock_response = AsyncMock()
-        mock_response.status = 200
-        mock_response.raise_for_status = MagicMock()
-        mock_response.read = AsyncMock(
-            return_value=f'{{"data":{{"wikidotPage":{{"createdBy":{{"id":"{encoded_id}"}}}}}}}}'.encode()
+    async def test_get_page_author_id_retry_after(
+        self, monkeypatch: pytest.MonkeyPatch, crom_session: _MockCromSession
+    ) -> None:
+        """Test that rate limited requests are retried after Retry-After."""
+        # Mock a rate limited response followed by a successful one
+        crom_session.set_responses(
+            _FakeResponse(status=429, headers={"Retry-After": "2"}),
+            _FakeResponse(_DELETED_PAYLOAD),
         )
 
-        # Mock the retry client
-        mock_retry_client = AsyncMock()
-        mock_retry_client.__aenter__ = AsyncMock(return_value=mock_response)
-        mock_retry_client.__aexit__ = AsyncMock(return_value=None)
-        mock_post_call = MagicMock(return_value=mock_retry_client)
-        mock_retry_client.post = mock_post_call
-
-        with (
-            patch("scoparia.crom.RetryClient") as mock_retry_client_class,
-            patch("scoparia.crom.aiohttp.ClientSession") as mock_session_class,
-        ):
-            mock_retry_client_class.return_value = mock_retry_client
-            mock_session = AsyncMock()
-            mock_session.__aenter__ = AsyncMock(return_value=mock_session)
-            mock_session.__aexit__ = AsyncMock(return_value=None)
-            mock_session_class.return_value = mock_session
+        mock_sleep = AsyncMock()
+        monkeypatch.setattr(crom.asyncio, "sleep", mock_sleep)
+
+        result = await get_page_author_id_from_crom(
+            "https://scp-wiki.wikidot.com", "scp-173"
+        )
+
+        assert result is None
+        assert crom_session.session.post.call_count == 2
+        mock_sleep.assert_called_once_with(2.0)
+
+    async def test_get_page_author_id_retries_exhausted(
+        self, monkeypatch: pytest.MonkeyPatch, crom_session: _MockCromSession
+    ) -> None:
+        """Test that the last error is raised once every retry has failed."""
+        crom_session.set_responses(
+            *[_FakeResponse(status=503)] * crom.CROM_RETRY_ATTEMPTS
+        )
 
+        mock_sleep = AsyncMock()
+        monkeypatch.setattr(crom.asyncio, "sleep", mock_sleep)
+
+        with pytest.raises(aiohttp.ClientResponseError) as exc_info:
+            await get_page_author_id_from_crom(
+                "https://scp-wiki.wikidot.com", "scp-173"
+            )
+
+        assert exc_info.value.status == 503
+        assert crom_session.session.post.call_count == crom.CROM_RETRY_ATTEMPTS
+        assert mock_sleep.await_count == crom.CROM_RETRY_ATTEMPTS - 1
+
+    async def test_get_page_author_id_not_retried_status(
+        self, monkeypatch: pytest.MonkeyPatch, crom_session: _MockCromSession
+    ) -> None:
+        """Test that server errors outside the retried statuses fail at once."""
+        crom_session.set_responses(_FakeResponse(status=501))
+
+        mock_sleep = AsyncMock()
+        monkeypatch.setattr(crom.asyncio, "sleep", mock_sleep)
+
+        with pytest.raises(aiohttp.ClientResponseError):
             await get_page_author_id_from_crom(
                 "https://scp-wiki.wikidot.com", "scp-173"
             )
 
-            # Verify that the URL was converted to HTTP
-            call_args = mock_post_call.call_args
-            assert call_args is not None
-            json_data = call_args[1]["json"]
-            variables = json_data["variables"]
-            assert "http://scp-wiki.wikidot.com" in variables["url"]
-            assert "https://scp-wiki.wikidot.com" not in variables["url"]
+        assert crom_session.session.post.call_count == 1
+        mock_sleep.assert_not_awaited()
+
+
+class TestGetSession:
+    """Test _get_session function."""
+
+    async def test_get_session_keeps_connections_alive(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Test that the shared session keeps idle connections for reuse."""
+        mock_connector = MagicMock()
+        mock_client_session = MagicMock()
+        mock_client_session.return_value.closed = False
+        monkeypatch.setattr(crom, "_session", None)
+        monkeypatch.setattr(crom.aiohttp, "TCPConnector", mock_connector)
+        monkeypatch.setattr(crom.aiohttp, "ClientSession", mock_client_session)
+
+        session = crom._get_session()
+
+        assert session is mock_client_session.return_value
+        assert crom._get_session() is session
+        mock_connector.assert_called_once_with(keepalive_timeout=60.0)
+        assert (
+            mock_client_session.call_args.kwargs["connector"]
+            is mock_connector.return_value
+        )
+
+
+class TestCleanupCrom:
+    """Test cleanup_crom function."""
+
+    async def test_cleanup_crom_closes_session(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Test that cleanup closes and resets the shared session."""
+        mock_session = AsyncMock()
+        monkeypatch.setattr(crom, "_session", mock_session)
+
+        await cleanup_crom()
+
+        assert crom._session is None
+        mock_session.close.assert_called_once()
@@ -1,199 +1,302 @@
 """Tests for Scoparia emailer module."""
 
-import os
-from unittest.mock import MagicMock, patch
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import MagicMock, PropertyMock
 
 import pytest
 
-from scoparia.emailer import _get_account, send_email
+from scoparia import emailer
+from scoparia.emailer import (
+    _describe_recipients,
+    _get_account,
+    _mask_email,
+    send_email_many,
+)
+
+
+@pytest.fixture(autouse=True)
+def _no_cached_account(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Start every test without a cached account and restore it afterwards."""
+    monkeypatch.setattr(emailer, "_account", None)
+    monkeypatch.setattr(emailer, "_token_expires_at", None)
+
+
+@pytest.fixture(autouse=True)
+def email_config(monkeypatch: pytest.MonkeyPatch) -> SimpleNamespace:
+    """Serve the email settings of a default configuration."""
+    config = SimpleNamespace(email_batch_size=500, email_concurrency=4)
+    monkeypatch.setattr(emailer, "get_config", lambda: config)
+    return config
+
+
+class TestMaskEmail:
+    """Test _mask_email function."""
+
+    def test_mask_email(self) -> None:
+        """Test masking keeps the first 3 chars and the domain."""
+        assert _mask_email("user@example.com") == "use***@example.com"
+        assert _mask_email("ab@test.com") == "ab***@test.com"
+
+    def test_mask_email_without_at(self) -> None:
+        """Test that a value without @ is fully masked."""
+        assert _mask_email("not-an-email") == "***"
 
 
 class TestGetAccount:
     """Test _get_account function."""
 
-    def test_get_account_missing_credentials(self) -> None:
+    def test_get_account_missing_credentials(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
         """Test that missing credentials raise ValueError."""
-        with (
-            patch.dict(os.environ, {}, clear=True),
-            pytest.raises(ValueError, match="O365_CLIENT_ID and O365_CLIENT_SECRET"),
-        ):
+        monkeypatch.setattr(emailer, "_CLIENT_ID", None)
+        monkeypatch.setattr(emailer, "_CLIENT_SECRET", None)
+
+        with pytest.raises(ValueError, match="O365_CLIENT_ID and O365_CLIENT_SECRET"):
             _get_account()
 
-    def test_get_account_missing_client_id(self) -> None:
+    def test_get_account_missing_client_id(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
         """Test that missing O365_CLIENT_ID raises ValueError."""
-        with (
-            patch.dict(os.environ, {"O365_CLIENT_SECRET": "secret"}, clear=True),
-            pytest.raises(ValueError, match="O365_CLIENT_ID and O365_CLIENT_SECRET"),
-        ):
+        monkeypatch.setattr(emailer, "_CLIENT_ID", None)
+        monkeypatch.setattr(emailer, "_CLIENT_SECRET", "secret")
+
+        with pytest.raises(ValueError, match="O365_CLIENT_ID and O365_CLIENT_SECRET"):
             _get_account()
 
-    def test_get_account_missing_client_secret(self) -> None:
+    def test_get_account_missing_client_secret(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
         """Test that missing O365_CLIENT_SECRET raises ValueError."""
-        with (
-            patch.dict(os.environ, {"O365_CLIENT_ID": "client_id"}, clear=True),
-            pytest.raises(ValueError, match="O365_CLIENT_ID and O365_CLIENT_SECRET"),
-        ):
+        monkeypatch.setattr(emailer, "_CLIENT_ID", "client_id")
+        monkeypatch.setattr(emailer, "_CLIENT_SECRET", None)
+
+        with pytest.raises(ValueError, match="O365_CLIENT_ID and O365_CLIENT_SECRET"):
             _get_account()
 
-    @patch("scoparia.emailer.Account")
-    @patch("scoparia.emailer.EnvTokenBackend")
-    @patch("scoparia.emailer.MSGraphProtocol")
-    @patch("scoparia.emailer._CLIENT_ID", "client_id")
-    @patch("scoparia.emailer._CLIENT_SECRET", "client_secret")
-    def test_get_account_success(
-        self,
-        mock_protocol: MagicMock,
-        mock_token_backend: MagicMock,
-        mock_account: MagicMock,
-    ) -> None:
+    def test_get_account_success(self, monkeypatch: pytest.MonkeyPatch) -> None:
         """Test successful account creation."""
-        with patch.dict(
-            os.environ,
-            {
-                "O365_TOKEN": "token",
-            },
-        ):
-            # Mock account instance
-            mock_account_instance = MagicMock()
-            mock_account_instance.is_authenticated = True
-            mock_account.return_value = mock_account_instance
-
-            # Mock protocol
-            mock_protocol_instance = MagicMock()
-            mock_protocol_instance.get_scopes_for.return_value = ["message_send"]
-            mock_protocol.return_value = mock_protocol_instance
-
-            # Mock token backend
-            mock_token_backend_instance = MagicMock()
-            mock_token_backend.return_value = mock_token_backend_instance
-
-            result = _get_account()
-
-            assert result == mock_account_instance
-            mock_account.assert_called_once()
-
-    @patch("scoparia.emailer.Account")
-    @patch("scoparia.emailer.EnvTokenBackend")
-    @patch("scoparia.emailer.MSGraphProtocol")
-    @patch("scoparia.emailer._CLIENT_ID", "client_id")
-    @patch("scoparia.emailer._CLIENT_SECRET", "client_secret")
-    @patch("scoparia.emailer._account", None)  # Reset global account
+        monkeypatch.setattr(emailer, "_CLIENT_ID", "client_id")
+        monkeypatch.setattr(emailer, "_CLIENT_SECRET", "client_secret")
+        monkeypatch.setenv("O365_TOKEN", "token")
+
+        # Mock account instance with a valid access token
+        mock_account_instance = MagicMock()
+        mock_account_instance.is_authenticated = True
+        token_backend = mock_account_instance.con.token_backend
+        token_backend.token_expiration_datetime.return_value = (
+            datetime.now() + timedelta(hours=1)
+        )
+        mock_account = MagicMock(return_value=mock_account_instance)
+        monkeypatch.setattr(emailer, "Account", mock_account)
+
+        # Mock protocol
+        mock_protocol_instance = MagicMock()
+        mock_protocol_instance.get_scopes_for.return_value = ["message_send"]
+        monkeypatch.setattr(
+            emailer, "MSGraphProtocol", MagicMock(return_value=mock_protocol_instance)
+        )
+
+        result = _get_account()
+
+        assert result == mock_account_instance
+        mock_account.assert_called_once()
+        mock_account_instance.con.refresh_token.assert_not_called()
+
     def test_get_account_authentication_failure(
-        self,
-        mock_protocol: MagicMock,
-        mock_token_backend: MagicMock,
-        mock_account: MagicMock,
+        self, monkeypatch: pytest.MonkeyPatch
     ) -> None:
         """Test that authentication failure raises RuntimeError."""
-        with patch.dict(
-            os.environ,
-            {
-                "O365_TOKEN": "token",
-            },
-        ):
-            # Mock account instance that fails authentication
-            mock_account_instance = MagicMock()
-            mock_account_instance.is_authenticated = False
-            mock_account_instance.authenticate.return_value = False
-            mock_account.return_value = mock_account_instance
-
-            # Mock protocol
-            mock_protocol_instance = MagicMock()
-            mock_protocol_instance.get_scopes_for.return_value = ["message_send"]
-            mock_protocol.return_value = mock_protocol_instance
-
-            # Mock token backend
-            mock_token_backend_instance = MagicMock()
-            mock_token_backend.return_value = mock_token_backend_instance
-
-            with pytest.raises(RuntimeError, match="O365 authentication failed"):
-                _get_account()
-
-
-class TestSendEmail:
-    """Test send_email function."""
-
-    @patch("scoparia.emailer._get_account")
-    def test_send_email_success(self, mock_get_account: MagicMock) -> None:
-        """Test successfully sending an email."""
-        # Mock account and mailbox
-        mock_message = MagicMock()
-        mock_message.send.return_value = True
-
-        mock_mailbox = MagicMock()
-        mock_mailbox.new_message.return_value = mock_message
+        monkeypatch.setattr(emailer, "_CLIENT_ID", "client_id")
+        monkeypatch.setattr(emailer, "_CLIENT_SECRET", "client_secret")
+        monkeypatch.setenv("O365_TOKEN", "token")
+
+        # Mock account instance that fails authentication
+        mock_account_instance = MagicMock()
+        mock_account_instance.is_authenticated = False
+        mock_account_instance.authenticate.return_value = False
+        monkeypatch.setattr(
+            emailer, "Account", MagicMock(return_value=mock_account_instance)
+        )
+
+        # Mock protocol
+        mock_protocol_instance = MagicMock()
+        mock_protocol_instance.get_scopes_for.return_value = ["message_send"]
+        monkeypatch.setattr(
+            emailer, "MSGraphProtocol", MagicMock(return_value=mock_protocol_instance)
+        )
 
+        with pytest.raises(RuntimeError, match="O365 authentication failed"):
+            _get_account()
+
+    def test_get_account_cached_token_valid(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Test that a comfortably valid cached token skips the auth probe."""
         mock_account = MagicMock()
-        mock_account.mailbox.return_value = mock_mailbox
-        mock_get_account.return_value = mock_account
+        is_authenticated = PropertyMock(return_value=True)
+        type(mock_account).is_authenticated = is_authenticated
 
-        result = send_email(
-            title="Test Subject",
-            body="Test Body",
-            to_email="test@example.com",
+        monkeypatch.setattr(emailer, "_account", mock_account)
+        monkeypatch.setattr(
+            emailer, "_token_expires_at", datetime.now() + timedelta(hours=1)
         )
 
-        assert result is True
-        mock_message.to.add.assert_called_once_with("test@example.com")
-        assert mock_message.subject == "Test Subject"
-        assert mock_message.body == "Test Body"
-        mock_message.send.assert_called_once()
+        result = _get_account()
 
-    @patch("scoparia.emailer._get_account")
-    def test_send_email_failure(self, mock_get_account: MagicMock) -> None:
-        """Test email sending failure."""
-        # Mock account and mailbox
-        mock_message = MagicMock()
-        mock_message.send.return_value = False
-
-        mock_mailbox = MagicMock()
-        mock_mailbox.new_message.return_value = mock_message
+        assert result == mock_account
+        is_authenticated.assert_not_called()
 
+    def test_get_account_refreshes_expiring_token(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Test that a token close to expiry is refreshed proactively."""
         mock_account = MagicMock()
-        mock_account.mailbox.return_value = mock_mailbox
-        mock_get_account.return_value = mock_account
+        mock_account.is_authenticated = True
+        token_backend = mock_account.con.token_backend
+        token_backend.token_is_long_lived.return_value = True
+        token_backend.token_expiration_datetime.side_effect = [
+            datetime.now() + timedelta(minutes=1),
+            datetime.now() + timedelta(hours=1),
+        ]
+
+        monkeypatch.setattr(emailer, "_account", mock_account)
+
+        result = _get_account()
+
+        assert result == mock_account
+        mock_account.con.refresh_token.assert_called_once()
+
+
+class _AsyncContext:
+    """Async context manager yielding a fixed value."""
+
+    def __init__(self, value: object) -> None:
+        self.value = value
+
+    async def __aenter__(self) -> object:
+        return self.value
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        return None
+
+
+class TestSendEmailMany:
+    """Test send_email_many function."""
+
+    @pytest.mark.asyncio
+    async def test_send_email_many_empty(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test that no messages means no authentication or requests."""
+        mock_get_token = MagicMock()
+        monkeypatch.setattr(emailer, "_get_access_token", mock_get_token)
 
-        result = send_email(
-            title="Test Subject",
-            body="Test Body",
-            to_email="test@example.com",
+        assert await send_email_many([]) == []
+        mock_get_token.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_send_email_many_success(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Test that each message is posted to Graph with its recipients."""
+        monkeypatch.setattr(
+            emailer, "_get_access_token", MagicMock(return_value="token")
         )
 
-        assert result is False
+        # Mock responses: first accepted, second rejected
+        accepted = SimpleNamespace(status=202)
+        rejected = SimpleNamespace(status=400)
 
-    @patch("scoparia.emailer._get_account")
-    def test_send_email_none_return(self, mock_get_account: MagicMock) -> None:
-        """Test email sending when send() returns None."""
-        # Mock account and mailbox
-        mock_message = MagicMock()
-        mock_message.send.return_value = None
+        # Mock the session, tracking only the calls asserted on below
+        mock_session = MagicMock()
+        mock_session.post = MagicMock(
+            side_effect=[_AsyncContext(accepted), _AsyncContext(rejected)]
+        )
+        mock_client_session = MagicMock(return_value=_AsyncContext(mock_session))
+        monkeypatch.setattr(emailer.aiohttp, "ClientSession", mock_client_session)
+
+        result = await send_email_many(
+            [
+                ("Title", "Body", "a@example.com"),
+                ("Title", "Body", ["b@example.com", "c@example.com"]),
+            ]
+        )
 
-        mock_mailbox = MagicMock()
-        mock_mailbox.new_message.return_value = mock_message
+        assert result == [True, False]
+        assert mock_client_session.call_args.kwargs["headers"] == {
+            "Authorization": "Bearer token"
+        }
+        payloads = [call.kwargs["json"] for call in mock_session.post.call_args_list]
+        assert payloads[0]["message"]["toRecipients"] == [
+            {"emailAddress": {"address": "a@example.com"}}
+        ]
+        assert payloads[1]["message"]["bccRecipients"] == [
+            {"emailAddress": {"address": "b@example.com"}},
+            {"emailAddress": {"address": "c@example.com"}},
+        ]
+
+    @pytest.mark.asyncio
+    async def test_send_email_many_bcc_batches(
+        self, monkeypatch: pytest.MonkeyPatch, email_config: SimpleNamespace
+    ) -> None:
+        """Test that a recipient list is split into BCC messages."""
+        email_config.email_batch_size = 2
+        monkeypatch.setattr(
+            emailer, "_get_access_token", MagicMock(return_value="token")
+        )
 
-        mock_account = MagicMock()
-        mock_account.mailbox.return_value = mock_mailbox
-        mock_get_account.return_value = mock_account
+        accepted = SimpleNamespace(status=202)
+        mock_session = MagicMock()
+        mock_session.post = MagicMock(
+            side_effect=[_AsyncContext(accepted), _AsyncContext(accepted)]
+        )
+        monkeypatch.setattr(
+            emailer.aiohttp,
+            "ClientSession",
+            MagicMock(return_value=_AsyncContext(mock_session)),
+        )
 
-        result = send_email(
-            title="Test Subject",
-            body="Test Body",
-            to_email="test@example.com",
+        recipients = ["a@example.com", "b@example.com", "c@example.com"]
+        result = await send_email_many([("Title", "Body", recipients)])
+
+        assert result == [True]
+        batches = [
+            [
+                recipient["emailAddress"]["address"]
+                for recipient in call.kwargs["json"]["message"]["bccRecipients"]
+            ]
+            for call in mock_session.post.call_args_list
+        ]
+        assert batches == [recipients[:2], recipients[2:]]
+
+    @pytest.mark.asyncio
+    async def test_send_email_many_logs_failed_batch(
+        self, monkeypatch: pytest.MonkeyPatch, email_config: SimpleNamespace
+    ) -> None:
+        """Test that a rejected BCC message logs only its own recipients."""
+        email_config.email_batch_size = 2
+        monkeypatch.setattr(
+            emailer, "_get_access_token", MagicMock(return_value="token")
+        )
+        mock_warning = MagicMock()
+        monkeypatch.setattr(emailer.logger, "warning", mock_warning)
+
+        accepted = SimpleNamespace(status=202)
+        rejected = SimpleNamespace(status=400)
+        mock_session = MagicMock()
+        mock_session.post = MagicMock(
+            side_effect=[_AsyncContext(accepted), _AsyncContext(rejected)]
+        )
+        monkeypatch.setattr(
+            emailer.aiohttp,
+            "ClientSession",
+            MagicMock(return_value=_AsyncContext(mock_session)),
         )
 
-        assert result is False
+        recipients = ["a@example.com", "b@example.com", "c@example.com"]
+        result = await send_email_many([("Title", "Body", recipients)])
 
-    @patch("scoparia.emailer._get_account")
-    def test_send_email_exception(self, mock_get_account: MagicMock) -> None:
-        """Test that email sending exceptions are handled."""
-        # Mock account that raises exception
-        mock_account = MagicMock()
-        mock_account.mailbox.side_effect = Exception("Connection error")
-        mock_get_account.return_value = mock_account
-
-        with pytest.raises(RuntimeError, match="Failed to send email"):
-            send_email(
-                title="Test Subject",
-                body="Test Body",
-                to_email="test@example.com",
-            )
+        assert result == [False]
+        mock_warning.assert_called_once()
+        assert mock_warning.call_args.args[1] == _describe_recipients(recipients[2:])
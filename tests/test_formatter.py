@@ -1,7 +1,9 @@
 """Tests for Scoparia formatter module."""
 
 from datetime import UTC, datetime
+from unittest.mock import patch
 
+import msgspec
 import pytest
 
 from scoparia.api import Link, RSSForumPost
@@ -9,30 +11,51 @@ from scoparia.formatter import (
     FTMLFormatter,
     HTMLFormatter,
     MarkdownFormatter,
+    NotificationFormatter,
     QQPushFormatter,
     TextFormatter,
+    _truncate_html_safe,
     generate_formatter,
 )
 
+# Post content longer than the default 200 character truncation limit
+_LONG_HTML = "<p>" + "x" * 300 + "</p>"
+
+# Breadcrumb links shared by the tests; formatters only read them
+_CATEGORY_LINK = Link(text="Test Category", url="https://example.com/category")
+_SAMPLE_PARENTS = (
+    Link(text="Category", url="https://example.com/category"),
+    Link(text="Thread", url="https://example.com/thread"),
+)
+
+
+@pytest.fixture(scope="module")
+def sample_post() -> RSSForumPost:
+    """Fixture providing a post shared by the module's tests.
+
+    Formatters never modify posts; tests needing other field values derive
+    a copy with msgspec.structs.replace.
+    """
+    return RSSForumPost(
+        post_id=123,
+        thread_id=456,
+        title="Test Post",
+        link="https://example.com",
+        author_name="TestUser",
+        content="<p>Test content</p>",
+        publish_time=datetime(2023, 1, 1, 12, 0, 0, tzinfo=UTC),
+        site_url="https://scp-wiki.wikidot.com",
+        parents=[],
+    )
+
 
 class TestHTMLFormatter:
     """Test HTML formatter."""
 
-    def test_format_time(self) -> None:
+    def test_format_time(self, sample_post: RSSForumPost) -> None:
         """Test formatting time in HTML format."""
         formatter = HTMLFormatter()
-        post = RSSForumPost(
-            post_id=123,
-            thread_id=456,
-            title="Test Post",
-            link="https://example.com",
-            author_name="TestUser",
-            content="<p>Test content</p>",
-            publish_time=datetime(2023, 1, 1, 12, 0, 0, tzinfo=UTC),
-            site_url="https://scp-wiki.wikidot.com",
-            parents=[],
-        )
-        time_str = formatter.format_time(post, "UTC")
+        time_str = formatter.format_time(sample_post, "UTC")
         assert "2023" in time_str
         assert "Jan" in time_str
 
@@ -43,68 +66,33 @@ class TestHTMLFormatter:
         result = formatter.format_content(html_content)
         assert result == html_content
 
-    def test_format_parent_link(self) -> None:
-        """Test formatting parent link in HTML."""
+    def test_compose_without_truncation(self, sample_post: RSSForumPost) -> None:
+        """Test that max_content_length=None keeps the full post content."""
         formatter = HTMLFormatter()
-        link = Link(text="Test Category", url="https://example.com/category")
-        result = formatter.format_parent_link(link)
-        assert '<a href="https://example.com/category">Test Category</a>' in result
+        formatter.max_content_length = None
+        post = msgspec.structs.replace(sample_post, content=_LONG_HTML)
+        _, body = formatter.compose_notification_content([post], "UTC")
+        assert _LONG_HTML in body
 
-    def test_format_header_with_title(self) -> None:
+    def test_format_header_with_title(self, sample_post: RSSForumPost) -> None:
         """Test formatting header with title."""
         formatter = HTMLFormatter()
-        post = RSSForumPost(
-            post_id=123,
-            thread_id=456,
-            title="Test Post",
-            link="https://example.com",
-            author_name="TestUser",
-            content="<p>Test</p>",
-            publish_time=datetime.now(UTC),
-            site_url="https://scp-wiki.wikidot.com",
-            parents=[],
-        )
-        header = formatter.format_header(post, "01 Jan 2023, 12:00:00 UTC")
+        header = formatter.format_header(sample_post, "01 Jan 2023, 12:00:00 UTC")
         assert "Test Post" in header
         assert "TestUser" in header
 
-    def test_format_header_without_title(self) -> None:
+    def test_format_header_without_title(self, sample_post: RSSForumPost) -> None:
         """Test formatting header without title."""
         formatter = HTMLFormatter()
-        post = RSSForumPost(
-            post_id=123,
-            thread_id=456,
-            title="",
-            link="https://example.com",
-            author_name="TestUser",
-            content="<p>Test</p>",
-            publish_time=datetime.now(UTC),
-            site_url="https://scp-wiki.wikidot.com",
-            parents=[],
-        )
+        post = msgspec.structs.replace(sample_post, title="")
         header = formatter.format_header(post, "01 Jan 2023, 12:00:00 UTC")
         assert "TestUser" in header
         assert "Test Post" not in header
 
-    def test_compose_notification_content(self) -> None:
+    def test_compose_notification_content(self, sample_post: RSSForumPost) -> None:
         """Test composing notification content in HTML format."""
         formatter = HTMLFormatter()
-        posts = [
-            RSSForumPost(
-                post_id=123,
-                thread_id=456,
-                title="Test Post",
-                link="https://example.com",
-                author_name="TestUser",
-                content="<p>Test content</p>",
-                publish_time=datetime.now(UTC),
-                site_url="https://scp-wiki.wikidot.com",
-                parents=[
-                    Link(text="Category", url="https://example.com/category"),
-                    Link(text="Thread", url="https://example.com/thread"),
-                ],
-            )
-        ]
+        posts = [msgspec.structs.replace(sample_post, parents=list(_SAMPLE_PARENTS))]
         title, body = formatter.compose_notification_content(posts, "UTC")
         assert "[Scoparia] New post" in title
         assert "Test Post" in body
@@ -112,31 +100,27 @@ class TestHTMLFormatter:
         assert "Test content" in body
         assert "Powered by" in body
 
-    def test_compose_notification_multiple_posts(self) -> None:
+    def test_compose_notification_multiple_posts(
+        self, sample_post: RSSForumPost
+    ) -> None:
         """Test composing notification with multiple posts."""
         formatter = HTMLFormatter()
         posts = [
-            RSSForumPost(
-                post_id=123,
-                thread_id=456,
+            msgspec.structs.replace(
+                sample_post,
                 title="Post 1",
                 link="https://example.com/1",
                 author_name="User1",
                 content="<p>Content 1</p>",
-                publish_time=datetime.now(UTC),
-                site_url="https://scp-wiki.wikidot.com",
-                parents=[],
             ),
-            RSSForumPost(
+            msgspec.structs.replace(
+                sample_post,
                 post_id=124,
                 thread_id=457,
                 title="Post 2",
                 link="https://example.com/2",
                 author_name="User2",
                 content="<p>Content 2</p>",
-                publish_time=datetime.now(UTC),
-                site_url="https://scp-wiki.wikidot.com",
-                parents=[],
             ),
         ]
         title, body = formatter.compose_notification_content(posts, "UTC")
@@ -156,34 +140,17 @@ class TestMarkdownFormatter:
         assert "Test" in result
         assert ">" in result  # Blockquote marker
 
-    def test_format_parent_link(self) -> None:
-        """Test formatting parent link in Markdown."""
+    def test_format_content_multiline_blockquote(self) -> None:
+        """Test that every line, including blank ones, is quoted."""
         formatter = MarkdownFormatter()
-        link = Link(text="Test Category", url="https://example.com/category")
-        result = formatter.format_parent_link(link)
-        assert "[Test Category](https://example.com/category)" in result
+        result = formatter.format_content("<p>First</p><p>Second</p>")
+        assert result == "> First\n> \n> Second"
 
-    def test_compose_notification_content(self) -> None:
-        """Test composing notification content in Markdown format."""
+    def test_format_content_unclosed_markup(self) -> None:
+        """Test that markup left open in one post doesn't affect the next."""
         formatter = MarkdownFormatter()
-        posts = [
-            RSSForumPost(
-                post_id=123,
-                thread_id=456,
-                title="Test Post",
-                link="https://example.com",
-                author_name="TestUser",
-                content="<p>Test content</p>",
-                publish_time=datetime.now(UTC),
-                site_url="https://scp-wiki.wikidot.com",
-                parents=[],
-            )
-        ]
-        title, body = formatter.compose_notification_content(posts, "UTC")
-        assert "[Scoparia] New post" in title
-        assert "Test Post" in body
-        assert "---" in body  # Separator
-        assert "Powered by" in body
+        formatter.format_content("<style>p { color: red }")
+        assert formatter.format_content("<p>Second post</p>") == "> Second post"
 
 
 class TestTextFormatter:
@@ -197,127 +164,50 @@ class TestTextFormatter:
         assert "Test" in result
         assert "<" not in result  # HTML tags should be removed
 
-    def test_format_parent_link(self) -> None:
-        """Test formatting parent link in plain text (no link)."""
+    def test_format_content_reused_formatter(self) -> None:
+        """Test that consecutive rich posts don't share converter state."""
         formatter = TextFormatter()
-        link = Link(text="Test Category", url="https://example.com/category")
-        result = formatter.format_parent_link(link)
-        assert result == "Test Category"
-        assert "http" not in result
-
-    def test_compose_notification_content(self) -> None:
-        """Test composing notification content in plain text format."""
+        # The first post leaves a <style> block open
+        first = formatter.format_content("<ul><li>First</li></ul><style>p {")
+        second = formatter.format_content("<ul><li>Second post</li></ul>")
+        assert first == "* First"
+        assert second == "* Second post"
+
+    def test_format_content_rich_markup(self) -> None:
+        """Test that lists keep their html2text layout."""
         formatter = TextFormatter()
-        posts = [
-            RSSForumPost(
-                post_id=123,
-                thread_id=456,
-                title="Test Post",
-                link="https://example.com",
-                author_name="TestUser",
-                content="<p>Test content</p>",
-                publish_time=datetime.now(UTC),
-                site_url="https://scp-wiki.wikidot.com",
-                parents=[],
-            )
-        ]
-        title, body = formatter.compose_notification_content(posts, "UTC")
-        assert "[Scoparia] New post" in title
-        assert "Test Post" in body
-        assert "══════" in body  # Separator
-        assert "Powered by" in body
+        html_content = "<ul><li>First</li><li>Second</li></ul>"
+        result = formatter.format_content(html_content)
+        assert result == "* First\n  * Second"
 
 
 class TestFTMLFormatter:
     """Test FTML formatter."""
 
-    def test_format_time(self) -> None:
+    def test_format_time(self, sample_post: RSSForumPost) -> None:
         """Test formatting time in FTML format."""
         formatter = FTMLFormatter()
-        post = RSSForumPost(
-            post_id=123,
-            thread_id=456,
-            title="Test Post",
-            link="https://example.com",
-            author_name="TestUser",
-            content="<p>Test</p>",
-            publish_time=datetime(2023, 1, 1, 12, 0, 0, tzinfo=UTC),
-            site_url="https://scp-wiki.wikidot.com",
-            parents=[],
-        )
-        time_str = formatter.format_time(post, "UTC")
+        time_str = formatter.format_time(sample_post, "UTC")
         assert "[[date" in time_str
         assert "format" in time_str
 
-    def test_format_parent_link(self) -> None:
-        """Test formatting parent link in FTML."""
-        formatter = FTMLFormatter()
-        link = Link(text="Test Category", url="https://example.com/category")
-        result = formatter.format_parent_link(link)
-        assert "[*https://example.com/category Test Category]" in result
-
-    def test_format_header(self) -> None:
+    def test_format_header(self, sample_post: RSSForumPost) -> None:
         """Test formatting header in FTML."""
         formatter = FTMLFormatter()
-        post = RSSForumPost(
-            post_id=123,
-            thread_id=456,
-            title="Test Post",
-            link="https://example.com",
-            author_name="TestUser",
-            content="<p>Test</p>",
-            publish_time=datetime.now(UTC),
-            site_url="https://scp-wiki.wikidot.com",
-            parents=[],
-        )
         header = formatter.format_header(
-            post, '[[date 1234567890 format="%e %b %Y, %H:%M:%S|agohover"]]'
+            sample_post, '[[date 1234567890 format="%e %b %Y, %H:%M:%S|agohover"]]'
         )
         assert "[[*user TestUser]]" in header
         assert "Test Post" in header
 
-    def test_compose_notification_content(self) -> None:
-        """Test composing notification content in FTML format."""
-        formatter = FTMLFormatter()
-        posts = [
-            RSSForumPost(
-                post_id=123,
-                thread_id=456,
-                title="Test Post",
-                link="https://example.com",
-                author_name="TestUser",
-                content="<p>Test content</p>",
-                publish_time=datetime.now(UTC),
-                site_url="https://scp-wiki.wikidot.com",
-                parents=[],
-            )
-        ]
-        title, body = formatter.compose_notification_content(posts, "UTC")
-        assert "[Scoparia] New post" in title
-        assert "Test Post" in body
-        assert "------" in body  # Separator
-        assert "[[*user TestUser]]" in body
-        assert "Powered by" in body
-
 
 class TestQQPushFormatter:
     """Test QQ Push formatter."""
 
-    def test_format_link_omitted(self) -> None:
+    def test_format_link_omitted(self, sample_post: RSSForumPost) -> None:
         """Test that links are omitted in QQ Push format."""
         formatter = QQPushFormatter()
-        post = RSSForumPost(
-            post_id=123,
-            thread_id=456,
-            title="Test Post",
-            link="https://example.com",
-            author_name="TestUser",
-            content="<p>Test</p>",
-            publish_time=datetime.now(UTC),
-            site_url="https://scp-wiki.wikidot.com",
-            parents=[],
-        )
-        link_line = formatter.format_link(post)
+        link_line = formatter.format_link(sample_post)
         assert link_line == ""
 
     def test_post_process_body_removes_links(self) -> None:
@@ -334,56 +224,134 @@ class TestQQPushFormatter:
         result = formatter.post_process_body(body)
         assert "123456789" not in result
 
-    def test_compose_notification_content(self) -> None:
-        """Test composing notification content in QQ Push format."""
-        formatter = QQPushFormatter()
-        posts = [
-            RSSForumPost(
-                post_id=123,
-                thread_id=456,
-                title="Test Post",
-                link="https://example.com",
-                author_name="TestUser",
-                content="<p>Test content</p>",
-                publish_time=datetime.now(UTC),
-                site_url="https://scp-wiki.wikidot.com",
-                parents=[],
-            )
-        ]
-        title, body = formatter.compose_notification_content(posts, "UTC")
+
+class TestFormatterTypes:
+    """Test behavior shared by the formatter types."""
+
+    @pytest.mark.parametrize(
+        ("formatter_cls", "expected"),
+        [
+            pytest.param(
+                HTMLFormatter,
+                '<a href="https://example.com/category">Test Category</a>',
+                id="html",
+            ),
+            pytest.param(
+                MarkdownFormatter,
+                "[Test Category](https://example.com/category)",
+                id="markdown",
+            ),
+            pytest.param(TextFormatter, "Test Category", id="text"),
+            pytest.param(
+                FTMLFormatter,
+                "[*https://example.com/category Test Category]",
+                id="ftml",
+            ),
+        ],
+    )
+    def test_format_parent_link(
+        self, formatter_cls: type[NotificationFormatter], expected: str
+    ) -> None:
+        """Test formatting a parent link in each format."""
+        assert formatter_cls().format_parent_link(_CATEGORY_LINK) == expected
+
+    @pytest.mark.parametrize(
+        ("formatter_cls", "expected", "unexpected"),
+        [
+            pytest.param(MarkdownFormatter, ["---", "Powered by"], [], id="markdown"),
+            pytest.param(TextFormatter, ["══════", "Powered by"], [], id="text"),
+            pytest.param(
+                FTMLFormatter,
+                ["------", "[[*user TestUser]]", "Powered by"],
+                [],
+                id="ftml",
+            ),
+            pytest.param(
+                QQPushFormatter, ["TestUser"], ["https://example.com"], id="qqpush"
+            ),
+        ],
+    )
+    def test_compose_notification_content(
+        self,
+        sample_post: RSSForumPost,
+        formatter_cls: type[NotificationFormatter],
+        expected: list[str],
+        unexpected: list[str],
+    ) -> None:
+        """Test composing notification content in each format."""
+        formatter = formatter_cls()
+        title, body = formatter.compose_notification_content([sample_post], "UTC")
         assert "[Scoparia] New post" in title
         assert "Test Post" in body
-        assert "TestUser" in body
-        assert "https://example.com" not in body  # Links should be removed
+        for fragment in expected:
+            assert fragment in body
+        for fragment in unexpected:
+            assert fragment not in body
 
 
 class TestGenerateFormatter:
     """Test formatter generation."""
 
-    def test_generate_html_formatter(self) -> None:
-        """Test generating HTML formatter."""
-        formatter = generate_formatter("html")
-        assert isinstance(formatter, HTMLFormatter)
+    @pytest.mark.parametrize(
+        ("format_type", "formatter_cls"),
+        [
+            ("html", HTMLFormatter),
+            ("markdown", MarkdownFormatter),
+            ("text", TextFormatter),
+            ("ftml", FTMLFormatter),
+            ("qqpush", QQPushFormatter),
+        ],
+    )
+    def test_generate_formatter(
+        self, format_type: str, formatter_cls: type[NotificationFormatter]
+    ) -> None:
+        """Test generating each supported formatter."""
+        formatter = generate_formatter(format_type)
+        assert isinstance(formatter, formatter_cls)
+
+    def test_generate_formatter_shared_instance(self) -> None:
+        """Test that one formatter instance is shared per format type."""
+        assert generate_formatter("markdown") is generate_formatter("markdown")
+
+    def test_compose_reuses_formatted_content(self, sample_post: RSSForumPost) -> None:
+        """Test that post content is converted once across compositions."""
+        formatter = generate_formatter("text")
+        post = msgspec.structs.replace(
+            sample_post,
+            post_id=789,
+            title="Shared Post",
+            content="<p>Content shared by several subscribers</p>",
+        )
+
+        with patch.object(
+            formatter, "format_content", wraps=formatter.format_content
+        ) as mock_format_content:
+            _, first = formatter.compose_notification_content([post], "UTC")
+            _, second = formatter.compose_notification_content([post], "Asia/Tokyo")
 
-    def test_generate_markdown_formatter(self) -> None:
-        """Test generating Markdown formatter."""
-        formatter = generate_formatter("markdown")
-        assert isinstance(formatter, MarkdownFormatter)
+        mock_format_content.assert_called_once()
+        assert "Content shared by several subscribers" in first
+        assert "Content shared by several subscribers" in second
 
-    def test_generate_text_formatter(self) -> None:
-        """Test generating text formatter."""
-        formatter = generate_formatter("text")
-        assert isinstance(formatter, TextFormatter)
+    def test_compose_reuses_rendered_sections(self, sample_post: RSSForumPost) -> None:
+        """Test that a post section is rendered once per timezone."""
+        formatter = HTMLFormatter()
+        post = msgspec.structs.replace(
+            sample_post,
+            post_id=790,
+            title="Popular Post",
+            content="<p>Content for many subscribers</p>",
+        )
 
-    def test_generate_ftml_formatter(self) -> None:
-        """Test generating FTML formatter."""
-        formatter = generate_formatter("ftml")
-        assert isinstance(formatter, FTMLFormatter)
+        with patch.object(
+            formatter, "_render_post_section", wraps=formatter._render_post_section
+        ) as mock_render:
+            _, first = formatter.compose_notification_content([post], "UTC")
+            _, second = formatter.compose_notification_content([post], "UTC")
+            formatter.compose_notification_content([post], "Asia/Tokyo")
 
-    def test_generate_qqpush_formatter(self) -> None:
-        """Test generating QQ Push formatter."""
-        formatter = generate_formatter("qqpush")
-        assert isinstance(formatter, QQPushFormatter)
+        assert first == second
+        assert mock_render.call_count == 2
 
     def test_generate_invalid_formatter(self) -> None:
         """Test that invalid formatter type raises ValueError."""
@@ -394,37 +362,34 @@ class TestGenerateFormatter:
 class TestTruncateHTMLSafe:
     """Test HTML truncation utility."""
 
-    def test_truncate_short_html(self) -> None:
-        """Test that short HTML is not truncated."""
-        from scoparia.formatter import _truncate_html_safe
-
-        html = "<p>Short content</p>"
-        result = _truncate_html_safe(html, max_length=200)
-        assert result == html
-
-    def test_truncate_long_html(self) -> None:
-        """Test that long HTML is truncated safely."""
-        from scoparia.formatter import _truncate_html_safe
-
-        html = "<p>" + "x" * 300 + "</p>"
-        result = _truncate_html_safe(html, max_length=200)
-        assert len(result) < len(html)  # Should be shorter than original
-        assert "..." in result
-
-    def test_truncate_empty_html(self) -> None:
-        """Test that empty HTML is handled correctly."""
-        from scoparia.formatter import _truncate_html_safe
-
-        html = ""
-        result = _truncate_html_safe(html, max_length=200)
-        assert result == html
-
-    def test_truncate_html_with_tags(self) -> None:
-        """Test that HTML with tags is truncated at safe position."""
-        from scoparia.formatter import _truncate_html_safe
-
-        html = "<p>Test content with <strong>bold</strong> text and more content</p>"
-        result = _truncate_html_safe(html, max_length=20)
-        assert len(result) < len(html)  # Should be shorter than original
-        assert "..." in result
-        # Should have valid HTML structure (no broken tags)
+    @pytest.mark.parametrize(
+        ("html", "max_length", "truncated"),
+        [
+            pytest.param("<p>Short content</p>", 200, False, id="short"),
+            pytest.param(_LONG_HTML, 200, True, id="long"),
+            pytest.param("", 200, False, id="empty"),
+            pytest.param(
+                "<p>Test content with <strong>bold</strong> text and more content</p>",
+                20,
+                True,
+                id="with_tags",
+            ),
+        ],
+    )
+    def test_truncate_html_safe(
+        self, html: str, max_length: int, truncated: bool
+    ) -> None:
+        """Test that only HTML longer than max_length is truncated."""
+        result = _truncate_html_safe(html, max_length=max_length)
+        if truncated:
+            assert len(result) < len(html)
+            assert "..." in result
+        else:
+            assert result == html
+
+    def test_truncate_html_closes_tags(self) -> None:
+        """Test that tags left open by truncation are closed."""
+        html = "<p>Hello <b>world " + "x" * 300 + "</b></p>"
+        result = _truncate_html_safe(html, max_length=50)
+        assert result.startswith("<p>Hello <b>world ")
+        assert result.endswith("...</b></p>")
@@ -2,165 +2,161 @@
 
 import base64
 import os
-import tempfile
+from pathlib import Path
 from unittest.mock import patch
 
+import pytest
+
 from scoparia.emailer import GitHubActionTokenBackend
-from scoparia.github_storage import set_github_variable
+from scoparia.github_storage import flush_github_env, set_github_variable
+
+
+@pytest.fixture
+def github_env(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> Path:
+    """Fixture pointing GITHUB_ENV at an empty temporary file."""
+    github_env_path = tmp_path / "github_env"
+    github_env_path.touch()
+    monkeypatch.setenv("GITHUB_ENV", str(github_env_path))
+    return github_env_path
+
+
+@pytest.fixture
+def token_env(monkeypatch: pytest.MonkeyPatch) -> str:
+    """Fixture restoring the TEST_TOKEN variable written by save_token."""
+    monkeypatch.setenv("TEST_TOKEN", "")
+    return "TEST_TOKEN"
 
 
 class TestSetGitHubVariable:
     """Test set_github_variable function."""
 
-    def test_set_github_variable_success(self) -> None:
+    def test_set_github_variable_success(self, github_env: Path) -> None:
         """Test successfully setting a GitHub variable."""
-        with tempfile.NamedTemporaryFile(mode="w", delete=False) as tmp_file:
-            github_env_path = tmp_file.name
-
-        try:
-            with patch.dict(os.environ, {"GITHUB_ENV": github_env_path}):
-                set_github_variable("TEST_VAR", "test_value")
-
-                # Verify the variable was written
-                with open(github_env_path) as f:
-                    content = f.read()
-                    assert "TEST_VAR=" in content
-                    assert "test_value" in content
-        finally:
-            # Clean up
-            if os.path.exists(github_env_path):
-                os.unlink(github_env_path)
-
-    def test_set_github_variable_json_string(self) -> None:
+        set_github_variable("TEST_VAR", "test_value")
+        flush_github_env()
+
+        # Verify the variable was written
+        content = github_env.read_text()
+        assert "TEST_VAR=" in content
+        assert "test_value" in content
+
+    def test_set_github_variable_json_string(self, github_env: Path) -> None:
         """Test setting a GitHub variable with a JSON string value."""
-        with tempfile.NamedTemporaryFile(mode="w", delete=False) as tmp_file:
-            github_env_path = tmp_file.name
-
-        try:
-            with patch.dict(os.environ, {"GITHUB_ENV": github_env_path}):
-                json_value = (
-                    '{"site1": "2023-01-01T00:00:00Z", "site2": "2023-01-02T00:00:00Z"}'
-                )
-                set_github_variable("LAST_RSS_CHECK", json_value)
-
-                # Verify the variable was written
-                with open(github_env_path) as f:
-                    content = f.read()
-                    assert "LAST_RSS_CHECK=" in content
-                    assert "site1" in content
-                    assert "site2" in content
-        finally:
-            # Clean up
-            if os.path.exists(github_env_path):
-                os.unlink(github_env_path)
-
-    def test_set_github_variable_no_github_env(self) -> None:
+        json_value = (
+            '{"site1": "2023-01-01T00:00:00Z", "site2": "2023-01-02T00:00:00Z"}'
+        )
+        set_github_variable("LAST_RSS_CHECK", json_value)
+        flush_github_env()
+
+        # Verify the variable was written
+        content = github_env.read_text()
+        assert "LAST_RSS_CHECK=" in content
+        assert "site1" in content
+        assert "site2" in content
+
+    def test_set_github_variable_bytes(self, github_env: Path) -> None:
+        """Test setting a GitHub variable with an encoded bytes value."""
+        set_github_variable("LAST_RSS_CHECK", b'{"site1": "2023-01-01"}')
+        flush_github_env()
+
+        # Verify the bytes were written without a bytes repr
+        assert github_env.read_text() == 'LAST_RSS_CHECK={"site1": "2023-01-01"}\n'
+
+    def test_set_github_variable_no_github_env(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
         """Test that missing GITHUB_ENV doesn't raise an error."""
-        with patch.dict(os.environ, {}, clear=True):
-            # Should not raise an error, just log a warning
-            set_github_variable("TEST_VAR", "test_value")
+        monkeypatch.delenv("GITHUB_ENV", raising=False)
 
-    def test_set_github_variable_json_array_string(self) -> None:
+        # Should not raise an error, just log a warning
+        set_github_variable("TEST_VAR", "test_value")
+
+    def test_set_github_variable_json_array_string(self, github_env: Path) -> None:
         """Test setting a GitHub variable with a JSON array string."""
-        with tempfile.NamedTemporaryFile(mode="w", delete=False) as tmp_file:
-            github_env_path = tmp_file.name
-
-        try:
-            with patch.dict(os.environ, {"GITHUB_ENV": github_env_path}):
-                json_array = (
-                    '["https://site1.wikidot.com", "https://site2.wikidot.com"]'
-                )
-                set_github_variable("RSS_SITE_URLS", json_array)
-
-                # Verify the variable was written
-                with open(github_env_path) as f:
-                    content = f.read()
-                    assert "RSS_SITE_URLS=" in content
-                    assert "site1" in content
-                    assert "site2" in content
-        finally:
-            # Clean up
-            if os.path.exists(github_env_path):
-                os.unlink(github_env_path)
-
-    def test_set_github_variable_multiple_calls(self) -> None:
+        json_array = '["https://site1.wikidot.com", "https://site2.wikidot.com"]'
+        set_github_variable("RSS_SITE_URLS", json_array)
+        flush_github_env()
+
+        # Verify the variable was written
+        content = github_env.read_text()
+        assert "RSS_SITE_URLS=" in content
+        assert "site1" in content
+        assert "site2" in content
+
+    def test_set_github_variable_multiple_calls(self, github_env: Path) -> None:
         """Test setting multiple GitHub variables."""
-        with tempfile.NamedTemporaryFile(mode="w", delete=False) as tmp_file:
-            github_env_path = tmp_file.name
-
-        try:
-            with patch.dict(os.environ, {"GITHUB_ENV": github_env_path}):
-                set_github_variable("VAR1", "value1")
-                set_github_variable("VAR2", "value2")
-
-                # Verify both variables were written
-                with open(github_env_path) as f:
-                    content = f.read()
-                    assert "VAR1=" in content
-                    assert "VAR2=" in content
-                    assert "value1" in content
-                    assert "value2" in content
-        finally:
-            # Clean up
-            if os.path.exists(github_env_path):
-                os.unlink(github_env_path)
-
-    def test_set_github_variable_base64_string(self) -> None:
+        set_github_variable("VAR1", "value1")
+        set_github_variable("VAR2", "value2")
+        flush_github_env()
+
+        # Verify both variables were written
+        content = github_env.read_text()
+        assert "VAR1=" in content
+        assert "VAR2=" in content
+        assert "value1" in content
+        assert "value2" in content
+
+    def test_set_github_variable_coalesces_writes(self, github_env: Path) -> None:
+        """Test that buffered writes keep only the last value per variable."""
+        set_github_variable("O365_TOKEN", "first")
+        set_github_variable("O365_TOKEN", "second")
+
+        # Nothing is written until the buffer is flushed
+        assert github_env.stat().st_size == 0
+
+        flush_github_env()
+
+        assert github_env.read_text() == "O365_TOKEN=second\n"
+
+    def test_flush_github_env_write_error(
+        self, monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+    ) -> None:
+        """Test that a failed write is raised to the caller of the flush."""
+        monkeypatch.setenv("GITHUB_ENV", str(tmp_path))
+        set_github_variable("LAST_RSS_CHECK", "{}")
+
+        with pytest.raises(OSError):
+            flush_github_env()
+
+        # The buffer is cleared so the exit fallback does not retry the write
+        flush_github_env()
+
+    def test_set_github_variable_base64_string(self, github_env: Path) -> None:
         """Test setting a GitHub variable with a base64 encoded string."""
-        with tempfile.NamedTemporaryFile(mode="w", delete=False) as tmp_file:
-            github_env_path = tmp_file.name
-
-        try:
-            with patch.dict(os.environ, {"GITHUB_ENV": github_env_path}):
-                # Simulate a base64 encoded token
-                token_data = b'{"access_token": "test_token", "expires_in": 3600}'
-                base64_token = base64.b64encode(token_data).decode("utf-8")
-                set_github_variable("O365_TOKEN", base64_token)
-
-                # Verify the variable was written
-                with open(github_env_path) as f:
-                    content = f.read()
-                    assert "O365_TOKEN=" in content
-                    assert base64_token in content
-        finally:
-            # Clean up
-            if os.path.exists(github_env_path):
-                os.unlink(github_env_path)
+        # Simulate a base64 encoded token
+        token_data = b'{"access_token": "test_token", "expires_in": 3600}'
+        base64_token = base64.b64encode(token_data).decode("utf-8")
+        set_github_variable("O365_TOKEN", base64_token)
+        flush_github_env()
+
+        # Verify the variable was written
+        content = github_env.read_text()
+        assert "O365_TOKEN=" in content
+        assert base64_token in content
 
 
 class TestGitHubActionTokenBackend:
     """Test GitHubActionTokenBackend class."""
 
-    def test_save_token_success(self) -> None:
+    def test_save_token_success(self, github_env: Path, token_env: str) -> None:
         """Test successfully saving a token."""
-        with tempfile.NamedTemporaryFile(mode="w", delete=False) as tmp_file:
-            github_env_path = tmp_file.name
-
-        try:
-            with patch.dict(os.environ, {"GITHUB_ENV": github_env_path}):
-                backend = GitHubActionTokenBackend(token_env_name="TEST_TOKEN")
-
-                # Mock the cache and serialize method
-                backend._cache = {"access_token": "test_token", "expires_in": 3600}
-                backend._has_state_changed = True
-
-                # Mock serialize to return bytes (simulating MSAL behavior)
-                with patch.object(backend, "serialize") as mock_serialize:
-                    mock_serialize.return_value = b'{"access_token": "test_token"}'
-
-                    result = backend.save_token()
-
-                    assert result is True
-                    # Check that token was set in environment
-                    assert "TEST_TOKEN" in os.environ
-                    # Check that token was written to GitHub environment file
-                    with open(github_env_path) as f:
-                        content = f.read()
-                        assert "TEST_TOKEN=" in content
-        finally:
-            # Clean up
-            if os.path.exists(github_env_path):
-                os.unlink(github_env_path)
+        backend = GitHubActionTokenBackend(token_env_name=token_env)
+
+        # Mock the cache and serialize method
+        backend._cache = {"access_token": "test_token", "expires_in": 3600}
+        backend._has_state_changed = True
+
+        # Mock serialize to return bytes (simulating MSAL behavior)
+        token_bytes = b'{"access_token": "test_token"}'
+        with patch.object(backend, "serialize", return_value=token_bytes):
+            result = backend.save_token()
+            flush_github_env()
+
+        assert result is True
+        # Check that the base64 token was set in environment
+        assert os.environ[token_env] == base64.b64encode(token_bytes).decode()
+        # Check that token was written to GitHub environment file
+        assert f"{token_env}=" in github_env.read_text()
 
     def test_save_token_no_cache(self) -> None:
         """Test save_token returns False when no cache."""
@@ -179,27 +175,18 @@ class TestGitHubActionTokenBackend:
         result = backend.save_token(force=False)
         assert result is True
 
-    def test_save_token_string_serialize(self) -> None:
+    @pytest.mark.usefixtures("github_env")
+    def test_save_token_string_serialize(self, token_env: str) -> None:
         """Test save_token when serialize returns string."""
-        with tempfile.NamedTemporaryFile(mode="w", delete=False) as tmp_file:
-            github_env_path = tmp_file.name
-
-        try:
-            with patch.dict(os.environ, {"GITHUB_ENV": github_env_path}):
-                backend = GitHubActionTokenBackend(token_env_name="TEST_TOKEN")
-                backend._cache = {"access_token": "test_token"}
-                backend._has_state_changed = True
-
-                # Mock serialize to return string
-                with patch.object(backend, "serialize") as mock_serialize:
-                    mock_serialize.return_value = '{"access_token": "test_token"}'
-
-                    result = backend.save_token()
-
-                    assert result is True
-                    assert "TEST_TOKEN" in os.environ
-                    assert os.environ["TEST_TOKEN"] == '{"access_token": "test_token"}'
-        finally:
-            # Clean up
-            if os.path.exists(github_env_path):
-                os.unlink(github_env_path)
+        backend = GitHubActionTokenBackend(token_env_name=token_env)
+        backend._cache = {"access_token": "test_token"}
+        backend._has_state_changed = True
+
+        # Mock serialize to return string
+        token_str = '{"access_token": "test_token"}'
+        with patch.object(backend, "serialize", return_value=token_str):
+            result = backend.save_token()
+            flush_github_env()
+
+        assert result is True
+        assert os.environ[token_env] == token_str
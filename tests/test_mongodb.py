@@ -1,22 +1,80 @@
 """Tests for Scoparia MongoDB module."""
 
+from collections import defaultdict
+from collections.abc import Callable, Coroutine
 from datetime import UTC, datetime
+from types import SimpleNamespace
+from typing import Any
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
+from scoparia import mongodb
 from scoparia.config import MentionLevel, UserInfo
 from scoparia.mongodb import MongoDBClient, get_mongodb, init_mongodb
 
 
+def _mock_cursor(*batches: list[dict[str, Any]]) -> MagicMock:
+    """Build a cursor whose to_list() returns each batch, then an empty one."""
+    cursor = MagicMock()
+    cursor.to_list = AsyncMock(side_effect=[*batches, []])
+    return cursor
+
+
+def _returning(value: Any = None) -> Callable[..., Coroutine[Any, Any, Any]]:
+    """Build a bare coroutine function returning value, for unasserted mocks."""
+
+    async def _coroutine(*args: Any, **kwargs: Any) -> Any:
+        return value
+
+    return _coroutine
+
+
+@pytest.fixture(scope="module")
+def mock_user_docs() -> tuple[dict[str, Any], ...]:
+    """Fixture providing user documents shared by the get_all_users tests.
+
+    The last document only has the required fields. Tests must not mutate
+    the documents.
+    """
+    return (
+        {
+            "userid": 123,
+            "username": "TestUser",
+            "apprise_urls": ["json://localhost"],
+            "timezone": "UTC",
+            "mention_level": "avatarhover",
+            "email": "test@example.com",
+            "enable_wikidot_pm": True,
+            "enable_email": True,
+            "enable_apprise": True,
+        },
+        {
+            "userid": 456,
+            "username": "AnotherUser",
+            "apprise_urls": [],
+            "timezone": "Asia/Shanghai",
+            "mention_level": "all",
+            "email": None,
+            "enable_wikidot_pm": True,
+            "enable_email": False,
+            "enable_apprise": False,
+        },
+        {"userid": 789, "username": "MinimalUser", "apprise_urls": []},
+    )
+
+
 class TestMongoDBClient:
     """Test MongoDBClient class."""
 
     @pytest.fixture
     def mock_mongo_client(self) -> AsyncMock:
-        """Create a mock MongoDB client."""
+        """Create a mock MongoDB client with a distinct mock per collection."""
+        collections: defaultdict[str, AsyncMock] = defaultdict(AsyncMock)
+        db = AsyncMock()
+        db.__getitem__ = MagicMock(side_effect=collections.__getitem__)
         client = AsyncMock()
-        client.__getitem__ = MagicMock(return_value=AsyncMock())
+        client.__getitem__ = MagicMock(return_value=db)
         return client
 
     @pytest.fixture
@@ -26,131 +84,216 @@ class TestMongoDBClient:
             client = MongoDBClient("mongodb://localhost:27017")
             client.client = mock_mongo_client
             client.db = mock_mongo_client["db_scoparia"]
+            client.users = client.db["t_users"]
+            client.metadata = client.db["t_metadata"]
             return client
 
+    def test_client_pool_options(self) -> None:
+        """Test that pool defaults are applied and can be overridden."""
+        with patch("scoparia.mongodb.AsyncMongoClient") as mock_client_class:
+            MongoDBClient("mongodb://localhost:27017", minPoolSize=0)
+
+        args, kwargs = mock_client_class.call_args
+        assert args == ("mongodb://localhost:27017",)
+        assert kwargs["maxPoolSize"] == 32
+        assert kwargs["minPoolSize"] == 0
+
+    def test_client_uri_options_take_precedence(self) -> None:
+        """Test that options set in the URI are not overridden by defaults."""
+        uri = "mongodb://localhost:27017/?retryWrites=false&maxpoolsize=5"
+        with patch("scoparia.mongodb.AsyncMongoClient") as mock_client_class:
+            MongoDBClient(uri)
+
+        args, kwargs = mock_client_class.call_args
+        assert args == (uri,)
+        assert "maxPoolSize" not in kwargs
+        assert "retryWrites" not in kwargs
+        assert kwargs["serverSelectionTimeoutMS"] == 5000
+
     @pytest.mark.asyncio
-    async def test_get_all_users(self, mongodb_client: MongoDBClient) -> None:
+    async def test_get_all_users(
+        self,
+        mongodb_client: MongoDBClient,
+        mock_user_docs: tuple[dict[str, Any], ...],
+    ) -> None:
         """Test getting all users from database."""
-        # Mock user documents
+        mongodb_client.db["t_users"].find = MagicMock(
+            return_value=_mock_cursor(list(mock_user_docs))
+        )
+
+        users = await mongodb_client.get_all_users()
+
+        assert list(users) == [123, 456, 789]
+        assert users[123].username == "TestUser"
+        assert users[123].mention_level == MentionLevel.AVATARHOVER
+        assert users[456].mention_level == MentionLevel.ALL
+        args, kwargs = mongodb_client.db["t_users"].find.call_args
+        assert args[1]["_id"] == 0
+        assert kwargs == {"batch_size": 1000}
+
+    @pytest.mark.asyncio
+    async def test_get_all_users_defaults(
+        self,
+        mongodb_client: MongoDBClient,
+        mock_user_docs: tuple[dict[str, Any], ...],
+    ) -> None:
+        """Test getting users with default values."""
+        mongodb_client.db["t_users"].find = MagicMock(
+            return_value=_mock_cursor(list(mock_user_docs))
+        )
+
+        users = await mongodb_client.get_all_users()
+
+        assert users[789].timezone == "UTC"
+        assert users[789].mention_level == MentionLevel.AVATARHOVER
+        assert users[789].email is None
+        assert users[789].enable_wikidot_pm is True
+        assert users[789].enable_email is True
+        assert users[789].enable_apprise is True
+        # Defaults are merged into new dicts, leaving the shared documents intact
+        assert mock_user_docs[2] == {
+            "userid": 789,
+            "username": "MinimalUser",
+            "apprise_urls": [],
+        }
+
+    @pytest.mark.asyncio
+    async def test_get_all_users_invalid_mention_level(
+        self, mongodb_client: MongoDBClient
+    ) -> None:
+        """Test that an unknown mention level falls back to avatarhover."""
         mock_users = [
             {
                 "userid": 123,
                 "username": "TestUser",
-                "apprise_urls": ["json://localhost"],
-                "timezone": "UTC",
-                "mention_level": "avatarhover",
-                "email": "test@example.com",
-                "enable_wikidot_pm": True,
-                "enable_email": True,
-                "enable_apprise": True,
-            },
-            {
-                "userid": 456,
-                "username": "AnotherUser",
                 "apprise_urls": [],
-                "timezone": "Asia/Shanghai",
-                "mention_level": "all",
-                "email": None,
-                "enable_wikidot_pm": True,
-                "enable_email": False,
-                "enable_apprise": False,
-            },
+                "mention_level": "everything",
+            }
         ]
 
-        # Create a proper async iterator mock
-        class AsyncIterator:
-            def __init__(self, items):
-                self.items = items
-                self.index = 0
-
-            def __aiter__(self):
-                return self
-
-            async def __anext__(self):
-                if self.index >= len(self.items):
-                    raise StopAsyncIteration
-                item = self.items[self.index]
-                self.index += 1
-                return item
-
-        mock_cursor = AsyncIterator(mock_users)
-        mongodb_client.db["t_users"].find = MagicMock(return_value=mock_cursor)
+        mongodb_client.db["t_users"].find = MagicMock(
+            return_value=_mock_cursor(mock_users)
+        )
 
         users = await mongodb_client.get_all_users()
 
-        assert len(users) == 2
-        assert 123 in users
-        assert 456 in users
-        assert users[123].username == "TestUser"
         assert users[123].mention_level == MentionLevel.AVATARHOVER
-        assert users[456].mention_level == MentionLevel.ALL
 
     @pytest.mark.asyncio
-    async def test_get_all_users_defaults(self, mongodb_client: MongoDBClient) -> None:
-        """Test getting users with default values."""
+    async def test_get_all_users_merges_defaults(
+        self, mongodb_client: MongoDBClient
+    ) -> None:
+        """Test that stored fields override defaults without mutating them."""
+        defaults = dict(mongodb._USER_DEFAULTS)
         mock_users = [
             {
                 "userid": 123,
                 "username": "TestUser",
                 "apprise_urls": [],
+                "timezone": "Asia/Shanghai",
+                "enable_email": False,
             }
         ]
 
-        # Create a proper async iterator mock
-        class AsyncIterator:
-            def __init__(self, items):
-                self.items = items
-                self.index = 0
+        mongodb_client.db["t_users"].find = MagicMock(
+            return_value=_mock_cursor(mock_users)
+        )
+
+        users = await mongodb_client.get_all_users()
+
+        assert users[123].timezone == "Asia/Shanghai"
+        assert users[123].enable_email is False
+        assert users[123].enable_apprise is True
+        assert defaults == mongodb._USER_DEFAULTS
+
+    @pytest.mark.asyncio
+    async def test_iter_users(self, mongodb_client: MongoDBClient) -> None:
+        """Test streaming users across several cursor batches."""
+        first_batch = [{"userid": 123, "username": "TestUser", "apprise_urls": []}]
+        second_batch = [{"userid": 456, "username": "AnotherUser", "apprise_urls": []}]
+
+        mongodb_client.db["t_users"].find = MagicMock(
+            return_value=_mock_cursor(first_batch, second_batch)
+        )
 
-            def __aiter__(self):
-                return self
+        users = [user_info async for user_info in mongodb_client.iter_users()]
 
-            async def __anext__(self):
-                if self.index >= len(self.items):
-                    raise StopAsyncIteration
-                item = self.items[self.index]
-                self.index += 1
-                return item
+        assert [user_info.userid for user_info in users] == [123, 456]
+        assert users[1].timezone == "UTC"
 
-        mock_cursor = AsyncIterator(mock_users)
+    @pytest.mark.asyncio
+    async def test_iter_users_batch_size(self, mongodb_client: MongoDBClient) -> None:
+        """Test that the configured batch size drives both find and to_list."""
+        mongodb_client._users_batch_size = 2
+        mock_cursor = _mock_cursor()
         mongodb_client.db["t_users"].find = MagicMock(return_value=mock_cursor)
 
-        users = await mongodb_client.get_all_users()
+        assert [user_info async for user_info in mongodb_client.iter_users()] == []
 
-        assert len(users) == 1
-        assert users[123].timezone == "UTC"
-        assert users[123].mention_level == MentionLevel.AVATARHOVER
-        assert users[123].email is None
-        assert users[123].enable_wikidot_pm is True
-        assert users[123].enable_email is True
-        assert users[123].enable_apprise is True
+        assert mongodb_client.db["t_users"].find.call_args.kwargs == {"batch_size": 2}
+        mock_cursor.to_list.assert_called_once_with(2)
 
     @pytest.mark.asyncio
-    async def test_get_user(self, mongodb_client: MongoDBClient) -> None:
-        """Test getting a specific user."""
-        mock_user = {
-            "userid": 123,
-            "username": "TestUser",
-            "apprise_urls": [],
-            "timezone": "UTC",
-        }
+    async def test_get_all_users_uses_to_list(
+        self, mongodb_client: MongoDBClient
+    ) -> None:
+        """Test that users are read in to_list batches, not per document."""
+        mock_users = [{"userid": 123, "username": "TestUser", "apprise_urls": []}]
+        mock_cursor = _mock_cursor(mock_users)
+        mongodb_client.db["t_users"].find = MagicMock(return_value=mock_cursor)
 
-        mongodb_client.db["t_users"].find_one = AsyncMock(return_value=mock_user)
+        await mongodb_client.get_all_users()
+
+        # One await for the batch and one for the empty batch ending the scan
+        assert mock_cursor.to_list.await_count == 2
+        mock_cursor.__aiter__.assert_not_called()
+
+    @pytest.mark.parametrize(
+        ("document", "userid"),
+        [
+            pytest.param(
+                {
+                    "userid": 123,
+                    "username": "TestUser",
+                    "apprise_urls": [],
+                    "timezone": "UTC",
+                },
+                123,
+                id="found",
+            ),
+            pytest.param(None, 999, id="not_found"),
+        ],
+    )
+    @pytest.mark.asyncio
+    async def test_get_user(
+        self,
+        mongodb_client: MongoDBClient,
+        document: dict[str, Any] | None,
+        userid: int,
+    ) -> None:
+        """Test getting a specific user, or None if it doesn't exist."""
+        mongodb_client.db["t_users"].find_one = AsyncMock(return_value=document)
 
-        user = await mongodb_client.get_user(123)
+        user = await mongodb_client.get_user(userid)
 
-        assert user is not None
-        assert user["userid"] == 123
-        assert user["username"] == "TestUser"
+        assert user == document
+        mongodb_client.db["t_users"].find_one.assert_called_once_with(
+            {"userid": userid}, {"_id": 0}
+        )
 
     @pytest.mark.asyncio
-    async def test_get_user_not_found(self, mongodb_client: MongoDBClient) -> None:
-        """Test getting a user that doesn't exist."""
-        mongodb_client.db["t_users"].find_one = AsyncMock(return_value=None)
+    async def test_get_user_projection(self, mongodb_client: MongoDBClient) -> None:
+        """Test that get_user forwards a narrower projection."""
+        mongodb_client.db["t_users"].find_one = AsyncMock(
+            return_value={"email": "test@example.com"}
+        )
 
-        user = await mongodb_client.get_user(999)
+        user = await mongodb_client.get_user(123, {"_id": 0, "email": 1})
 
-        assert user is None
+        assert user == {"email": "test@example.com"}
+        mongodb_client.db["t_users"].find_one.assert_called_once_with(
+            {"userid": 123}, {"_id": 0, "email": 1}
+        )
 
     @pytest.mark.asyncio
     async def test_remove_user(self, mongodb_client: MongoDBClient) -> None:
@@ -161,6 +304,18 @@ class TestMongoDBClient:
 
         mongodb_client.db["t_users"].delete_one.assert_called_once_with({"userid": 123})
 
+    @pytest.mark.asyncio
+    async def test_remove_users(self, mongodb_client: MongoDBClient) -> None:
+        """Test removing several users with one delete_many."""
+        mongodb_client.db["t_users"].delete_many = AsyncMock()
+
+        await mongodb_client.remove_users([123, 456])
+        await mongodb_client.remove_users([])
+
+        mongodb_client.db["t_users"].delete_many.assert_called_once_with(
+            {"userid": {"$in": [123, 456]}}
+        )
+
     @pytest.mark.asyncio
     async def test_upsert_contacts(self, mongodb_client: MongoDBClient) -> None:
         """Test upserting contacts."""
@@ -177,6 +332,23 @@ class TestMongoDBClient:
         call_args = mongodb_client.db["t_users"].bulk_write.call_args
         operations = call_args[0][0]
         assert len(operations) == 2
+        assert call_args.kwargs == {"ordered": False}
+
+    @pytest.mark.asyncio
+    async def test_upsert_contacts_chunked(self, mongodb_client: MongoDBClient) -> None:
+        """Test that large contact syncs are split into bounded bulk writes."""
+        contacts = [
+            {"userid": userid, "username": f"User{userid}", "email": None}
+            for userid in range(5)
+        ]
+
+        mongodb_client.db["t_users"].bulk_write = AsyncMock()
+
+        with patch("scoparia.mongodb._BULK_WRITE_CHUNK_SIZE", 2):
+            await mongodb_client.upsert_contacts(contacts)
+
+        calls = mongodb_client.db["t_users"].bulk_write.call_args_list
+        assert [len(call.args[0]) for call in calls] == [2, 2, 1]
 
     @pytest.mark.asyncio
     async def test_upsert_contacts_empty(self, mongodb_client: MongoDBClient) -> None:
@@ -212,6 +384,7 @@ class TestMongoDBClient:
         call_args = mongodb_client.db["t_users"].bulk_write.call_args
         operations = call_args[0][0]
         assert len(operations) == 1
+        assert call_args.kwargs == {"ordered": False}
 
     @pytest.mark.asyncio
     async def test_upsert_users_empty(self, mongodb_client: MongoDBClient) -> None:
@@ -222,26 +395,33 @@ class TestMongoDBClient:
 
         mongodb_client.db["t_users"].bulk_write.assert_not_called()
 
+    @pytest.mark.parametrize(
+        ("document", "expected"),
+        [
+            pytest.param(
+                {
+                    "key": "last_rss_check",
+                    "value": {"site1": datetime(2023, 1, 1, tzinfo=UTC)},
+                },
+                {"site1": datetime(2023, 1, 1, tzinfo=UTC)},
+                id="found",
+            ),
+            pytest.param(None, None, id="not_found"),
+        ],
+    )
     @pytest.mark.asyncio
-    async def test_get_metadata(self, mongodb_client: MongoDBClient) -> None:
-        """Test getting metadata."""
-        mock_metadata = {"key": "last_rss_check", "value": {"site1": datetime.now(UTC)}}
-
-        mongodb_client.db["t_metadata"].find_one = AsyncMock(return_value=mock_metadata)
+    async def test_get_metadata(
+        self,
+        mongodb_client: MongoDBClient,
+        document: dict[str, Any] | None,
+        expected: dict[str, datetime] | None,
+    ) -> None:
+        """Test getting metadata, or None if it doesn't exist."""
+        mongodb_client.db["t_metadata"].find_one = _returning(document)
 
         value = await mongodb_client.get_metadata("last_rss_check")
 
-        assert value is not None
-        assert isinstance(value, dict)
-
-    @pytest.mark.asyncio
-    async def test_get_metadata_not_found(self, mongodb_client: MongoDBClient) -> None:
-        """Test getting metadata that doesn't exist."""
-        mongodb_client.db["t_metadata"].find_one = AsyncMock(return_value=None)
-
-        value = await mongodb_client.get_metadata("nonexistent")
-
-        assert value is None
+        assert value == expected
 
     @pytest.mark.asyncio
     async def test_set_metadata(self, mongodb_client: MongoDBClient) -> None:
@@ -252,6 +432,34 @@ class TestMongoDBClient:
         await mongodb_client.set_metadata("last_rss_check", metadata_value)
 
         mongodb_client.db["t_metadata"].update_one.assert_called_once()
+        mongodb_client.db["t_users"].update_one.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_get_metadata_cached(self, mongodb_client: MongoDBClient) -> None:
+        """Test that repeated metadata reads hit MongoDB once."""
+        mock_metadata = {"key": "last_rss_check", "value": {"site1": "2023-01-01"}}
+
+        mongodb_client.db["t_metadata"].find_one = AsyncMock(return_value=mock_metadata)
+
+        first = await mongodb_client.get_metadata("last_rss_check")
+        second = await mongodb_client.get_metadata("last_rss_check")
+
+        assert first == second == {"site1": "2023-01-01"}
+        mongodb_client.db["t_metadata"].find_one.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_set_metadata_write_through(
+        self, mongodb_client: MongoDBClient
+    ) -> None:
+        """Test that written metadata is read back without a query."""
+        mongodb_client.db["t_metadata"].update_one = AsyncMock()
+        mongodb_client.db["t_metadata"].find_one = AsyncMock()
+
+        await mongodb_client.set_metadata("last_rss_check", {"site1": "2023-01-02"})
+        value = await mongodb_client.get_metadata("last_rss_check")
+
+        assert value == {"site1": "2023-01-02"}
+        mongodb_client.db["t_metadata"].find_one.assert_not_called()
 
     @pytest.mark.asyncio
     async def test_close(self, mongodb_client: MongoDBClient) -> None:
@@ -268,7 +476,7 @@ class TestMongoDBClient:
     ) -> None:
         """Test schema validation for new collections."""
         # Mock that collections don't exist
-        mongodb_client.db.list_collection_names = AsyncMock(return_value=[])
+        mongodb_client.db.list_collections = AsyncMock(return_value=_mock_cursor())
 
         # Mock collection creation
         mongodb_client.db.create_collection = AsyncMock()
@@ -279,6 +487,10 @@ class TestMongoDBClient:
 
         # Should create both collections
         assert mongodb_client.db.create_collection.call_count == 2
+        mongodb_client.db["t_users"].create_index.assert_awaited_once_with(
+            [("userid", 1)], unique=True
+        )
+        mongodb_client.db["t_metadata"].create_index.assert_awaited_once()
 
     @pytest.mark.asyncio
     async def test_ensure_schema_validation_existing_collections(
@@ -286,9 +498,8 @@ class TestMongoDBClient:
     ) -> None:
         """Test schema validation when collections already exist."""
         # Mock that collections exist
-        mongodb_client.db.list_collection_names = AsyncMock(
-            return_value=["t_users", "t_metadata"]
-        )
+        mock_cursor = _mock_cursor([{"name": "t_users"}, {"name": "t_metadata"}])
+        mongodb_client.db.list_collections = AsyncMock(return_value=mock_cursor)
 
         mongodb_client.db.create_collection = AsyncMock()
 
@@ -296,84 +507,109 @@ class TestMongoDBClient:
 
         # Should not create collections
         mongodb_client.db.create_collection.assert_not_called()
+        # Should only list the collections it manages
+        assert mongodb_client.db.list_collections.call_args.kwargs["filter"] == {
+            "name": {"$in": ["t_users", "t_metadata"]}
+        }
+
+    @pytest.mark.asyncio
+    async def test_ensure_schema_validation_partial_collections(
+        self, mongodb_client: MongoDBClient
+    ) -> None:
+        """Test that only the missing collection is created."""
+        # Mock that only the users collection exists
+        mock_cursor = _mock_cursor([{"name": "t_users"}])
+        mongodb_client.db.list_collections = AsyncMock(return_value=mock_cursor)
+
+        mongodb_client.db.create_collection = AsyncMock()
+        mongodb_client.db["t_metadata"].create_index = AsyncMock()
+
+        await mongodb_client.ensure_schema_validation()
+
+        mongodb_client.db.create_collection.assert_called_once()
+        assert mongodb_client.db.create_collection.call_args.args == ("t_metadata",)
+        mongodb_client.db["t_metadata"].create_index.assert_called_once()
+
+
+@pytest.fixture
+def mongodb_env(monkeypatch: pytest.MonkeyPatch) -> SimpleNamespace:
+    """Fixture mocking config and client class for the global MongoDB instance.
+
+    The global instance starts empty and is restored after the test.
+    """
+    config = MagicMock(mongodb_uri="mongodb://localhost:27017", mongodb_batch_size=500)
+    client_class = MagicMock()
+    client_class.return_value.ensure_schema_validation = AsyncMock()
+    client_class.return_value.client.admin.command = AsyncMock()
+    monkeypatch.setattr(mongodb, "_mongodb_instance", None)
+    monkeypatch.setattr(mongodb, "get_config", lambda: config)
+    monkeypatch.setattr(mongodb, "MongoDBClient", client_class)
+    return SimpleNamespace(config=config, client_class=client_class)
 
 
 class TestMongoDBGlobalFunctions:
     """Test global MongoDB functions."""
 
     @pytest.mark.asyncio
-    async def test_init_mongodb_with_uri(self) -> None:
+    async def test_init_mongodb_with_uri(self, mongodb_env: SimpleNamespace) -> None:
         """Test initializing MongoDB with URI."""
-        with (
-            patch("scoparia.mongodb.get_config") as mock_get_config,
-            patch("scoparia.mongodb.MongoDBClient") as mock_client_class,
-            patch("scoparia.mongodb.AsyncMongoClient"),
-        ):
-            mock_config = MagicMock()
-            mock_config.mongodb_uri = "mongodb://localhost:27017"
-            mock_get_config.return_value = mock_config
-
-            mock_client_instance = AsyncMock()
-            mock_client_instance.ensure_schema_validation = AsyncMock()
-            mock_client_class.return_value = mock_client_instance
+        await init_mongodb()
+
+        mongodb_env.client_class.assert_called_once_with(
+            "mongodb://localhost:27017", users_batch_size=500
+        )
+        client = mongodb_env.client_class.return_value
+        client.ensure_schema_validation.assert_awaited_once()
+        client.client.admin.command.assert_awaited_once_with("ping")
+        assert get_mongodb() is client
+
+    @pytest.mark.asyncio
+    async def test_init_mongodb_ping_failure(
+        self, mongodb_env: SimpleNamespace
+    ) -> None:
+        """Test that a failed ping skips the schema setup."""
+        client = mongodb_env.client_class.return_value
+        client.client.admin.command.side_effect = ConnectionError("unreachable")
 
+        with pytest.raises(ConnectionError, match="unreachable"):
             await init_mongodb()
 
-            mock_client_class.assert_called_once_with("mongodb://localhost:27017")
-            mock_client_instance.ensure_schema_validation.assert_called_once()
+        client.ensure_schema_validation.assert_not_awaited()
 
     @pytest.mark.asyncio
-    async def test_init_mongodb_no_database_mode(self) -> None:
+    async def test_init_mongodb_no_database_mode(
+        self, mongodb_env: SimpleNamespace
+    ) -> None:
         """Test initializing MongoDB in no-database mode."""
-        with (
-            patch("scoparia.mongodb.get_config") as mock_get_config,
-            patch("scoparia.mongodb.MongoDBClient") as mock_client_class,
-            patch("scoparia.mongodb._mongodb_instance", None),
-        ):
-            mock_config = MagicMock()
-            mock_config.mongodb_uri = None
-            mock_get_config.return_value = mock_config
+        mongodb_env.config.mongodb_uri = None
 
-            await init_mongodb()
+        await init_mongodb()
 
-            mock_client_class.assert_not_called()
+        mongodb_env.client_class.assert_not_called()
+        assert mongodb._mongodb_instance is None
 
     @pytest.mark.asyncio
-    async def test_init_mongodb_already_initialized(self) -> None:
+    async def test_init_mongodb_already_initialized(
+        self, mongodb_env: SimpleNamespace
+    ) -> None:
         """Test that initializing MongoDB twice raises RuntimeError."""
-        with (
-            patch("scoparia.mongodb.get_config") as mock_get_config,
-            patch("scoparia.mongodb.MongoDBClient") as mock_client_class,
-            patch("scoparia.mongodb._mongodb_lock") as mock_lock,
-        ):
-            mock_config = MagicMock()
-            mock_config.mongodb_uri = "mongodb://localhost:27017"
-            mock_get_config.return_value = mock_config
-
-            mock_client_instance = AsyncMock()
-            mock_client_instance.ensure_schema_validation = AsyncMock()
-            mock_client_class.return_value = mock_client_instance
+        await init_mongodb()
 
-            # Mock lock to simulate already initialized
-            async def lock_enter(self):
-                raise RuntimeError("MongoDB already initialized.")
-
-            mock_lock.__aenter__ = lock_enter
+        with pytest.raises(RuntimeError, match="MongoDB already initialized"):
+            await init_mongodb()
 
-            with pytest.raises(RuntimeError, match="MongoDB already initialized"):
-                await init_mongodb()
+        mongodb_env.client_class.assert_called_once()
 
-    def test_get_mongodb_not_initialized(self) -> None:
+    def test_get_mongodb_not_initialized(self, monkeypatch: pytest.MonkeyPatch) -> None:
         """Test that getting MongoDB before initialization raises RuntimeError."""
-        with (
-            patch("scoparia.mongodb._mongodb_instance", None),
-            pytest.raises(RuntimeError, match="MongoDB not initialized"),
-        ):
+        monkeypatch.setattr(mongodb, "_mongodb_instance", None)
+
+        with pytest.raises(RuntimeError, match="MongoDB not initialized"):
             get_mongodb()
 
-    def test_get_mongodb_initialized(self) -> None:
+    def test_get_mongodb_initialized(self, monkeypatch: pytest.MonkeyPatch) -> None:
         """Test getting MongoDB after initialization."""
         mock_instance = MagicMock()
-        with patch("scoparia.mongodb._mongodb_instance", mock_instance):
-            result = get_mongodb()
-            assert result == mock_instance
+        monkeypatch.setattr(mongodb, "_mongodb_instance", mock_instance)
+
+        assert get_mongodb() is mock_instance